@@ -1,7 +1,8 @@
-import os
-import json
 import streamlit as st
 
+from utils import assets
+from utils.signups import get_signups
+
 # ========== AUTO-REDIRECT IF LOGGED IN ==========
 if st.session_state.get("username"):
     st.switch_page("pages/EverAge AI App.py")
@@ -29,7 +30,7 @@ st.markdown("""
 
 # ========== MAIN LOGO AND HEADER ==========
 st.markdown("<div style='text-align: center;'>", unsafe_allow_html=True)
-st.image("static/everage_full_logo.png", width=240)
+st.image(assets.image("static/everage_full_logo.png", 240), width=240)
 st.markdown("""
     <h1 style='color: #0A7E8C; font-size: 2.5em; margin-bottom: 0.2em;'>Live Smarter. Live Longer.</h1>
     <p style='font-size: 1.2em; color: #444;'>Your AI-powered longevity copilot.</p>
@@ -51,10 +52,10 @@ with col1:
     - All powered by GPT-4  
     """)
 
-    gif_path = os.path.join("static", "demo.gif")
+    demo_url = assets.demo_url()
     st.markdown("### 🔍 See EverAge in Action")
-    if os.path.exists(gif_path):
-        st.image(gif_path, use_container_width=True)
+    if demo_url:
+        st.markdown(assets.demo_html(demo_url), unsafe_allow_html=True)
     else:
         st.info("🚫 Demo GIF not found. Please add 'demo.gif' to the static/ folder.")
 
@@ -71,51 +72,22 @@ with col2:
 
     col_a, col_b = st.columns(2)
 
+    def start_app(username, demo_mode):
+        if not valid_email:
+            st.warning("Enter a valid email to continue.")
+            return
+        st.session_state.username = username
+        st.session_state.demo_mode = demo_mode
+        get_signups().add(email_input, source="demo" if demo_mode else "app")
+        st.switch_page("pages/EverAge AI App.py")
+
     with col_a:
         if st.button("Start EverAge AI App"):
-            if valid_email:
-                st.session_state.username = "guest_user"
-                st.session_state.demo_mode = False
-
-                os.makedirs("data", exist_ok=True)
-                email_file = "data/emails.json"
-                if os.path.exists(email_file):
-                    with open(email_file, "r") as f:
-                        emails = json.load(f)
-                else:
-                    emails = []
-
-                if email_input not in emails:
-                    emails.append(email_input)
-                    with open(email_file, "w") as f:
-                        json.dump(emails, f, indent=2)
-
-                st.switch_page("pages/EverAge AI App.py")
-            else:
-                st.warning("Enter a valid email to continue.")
+            start_app("guest_user", demo_mode=False)
 
     with col_b:
         if st.button("🔍 Try Without Login"):
-            if valid_email:
-                st.session_state.username = "demo_user"
-                st.session_state.demo_mode = True
-
-                os.makedirs("data", exist_ok=True)
-                email_file = "data/emails.json"
-                if os.path.exists(email_file):
-                    with open(email_file, "r") as f:
-                        emails = json.load(f)
-                else:
-                    emails = []
-
-                if email_input not in emails:
-                    emails.append(email_input)
-                    with open(email_file, "w") as f:
-                        json.dump(emails, f, indent=2)
-
-                st.switch_page("pages/EverAge AI App.py")
-            else:
-                st.warning("Enter a valid email to continue.")
+            start_app("demo_user", demo_mode=True)
 
 # ========== TRUST BOOSTERS ==========
 st.markdown("---")
@@ -128,10 +100,8 @@ st.markdown("""
 
 # ========== DYNAMIC TESTIMONIALS FROM FILE ==========
 st.markdown("### 💬 What People Are Saying")
-testimonial_file = "data/testimonials.json"
-if os.path.exists(testimonial_file):
-    with open(testimonial_file, "r") as f:
-        testimonials = json.load(f)
+testimonials = assets.testimonials()
+if testimonials is not None:
     for t in testimonials:
         st.info(f"⭐️⭐️⭐️⭐️⭐️ *\"{t['quote']}\"* – {t['author']}")
 else:
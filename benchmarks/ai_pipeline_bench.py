@@ -0,0 +1,77 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import openai
+
+from tools.stub_openai_server import start_server
+from utils import ai_backends, ai_cache
+from utils.ai import calculate_scores, extract_habits, get_ai_plan
+from utils.ai_async import generate_plan, generate_plan_bundle
+
+# Compares the serial plan -> habits -> scores path, the concurrent pipeline and the
+# single structured call against the local stub server, so no API key or network is needed.
+# --backend stub skips HTTP altogether and uses the in-process stub backend.
+#
+#   python benchmarks/ai_pipeline_bench.py --latency 0.5 --runs 3
+#   python benchmarks/ai_pipeline_bench.py --backend stub
+
+PROMPT = "Age: 40, Activity: Moderate, Sleep: Average, Stress: High, Diet: Standard, Goals: more energy"
+
+
+def serial():
+    plan = get_ai_plan(PROMPT, bypass_cache=True)
+    return plan, extract_habits(plan), calculate_scores(PROMPT, bypass_cache=True)
+
+
+def concurrent():
+    return generate_plan_bundle(PROMPT, bypass_cache=True)
+
+
+def structured():
+    return generate_plan(PROMPT, bypass_cache=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Wall time of the AI plan generation paths")
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--backend", choices=["openai", "stub"], default="openai",
+                        help="openai = OpenAI client against the stub HTTP server")
+    args = parser.parse_args()
+
+    server = None
+    if args.backend == "stub":
+        ai_backends.set_backend("stub")
+        ai_backends.get_backend().latency = args.latency
+    else:
+        server, base_url = start_server(latency=args.latency)
+        openai.base_url = base_url
+        openai.api_key = "stub"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # max_entries=0 keeps the cache empty, so every call really reaches the stub
+        ai_cache._cache.set(ai_cache.ResponseCache(os.path.join(tmp, "cache.db"), max_entries=0))
+        for name, fn in [("serial", serial), ("concurrent", concurrent), ("structured", structured)]:
+            timings = []
+            for _ in range(args.runs):
+                start = time.perf_counter()
+                fn()
+                timings.append(time.perf_counter() - start)
+            print(f"{name:>10}: best {min(timings):.2f}s, mean {sum(timings) / len(timings):.2f}s")
+    print(f"(stub latency {args.latency}s: expect ~{3 * args.latency:.2f}s serial, "
+          f"~{2 * args.latency:.2f}s concurrent, ~{args.latency:.2f}s structured)")
+    for name, stats in ai_backends.backend_stats().items():
+        print(f"{name} backend: {stats['calls']} calls, p50 {stats['latency_p50']:.2f}s, "
+              f"p95 {stats['latency_p95']:.2f}s, {stats['prompt_tokens'] + stats['completion_tokens']} tokens, "
+              f"${stats['cost_usd']:.4f}")
+    if server:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
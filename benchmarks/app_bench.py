@@ -0,0 +1,357 @@
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# End-to-end benchmark suite: drives app.py and the main page headlessly with Streamlit's
+# AppTest, with the in-process stub AI backend and a local fake SendGrid, so no keys or network
+# are needed. Each run writes one JSON file; --compare prints the change against an older one.
+#
+#   python benchmarks/app_bench.py                          # -> benchmarks/results/<time>-<commit>.json
+#   python benchmarks/app_bench.py --quick
+#   python benchmarks/app_bench.py --compare benchmarks/results/old.json
+#
+# Measured:
+#   rerun      cold/warm rerun latency of app.py and the page, opening Progress, a check-in and an email rerun
+#   memory     traced Python memory per extra live session
+#   storage    load/update cost of a user record vs number of users and plan history length
+#   sessions   reruns/sec with K concurrent simulated sessions
+
+PAGE = os.path.join("pages", "EverAge AI App.py")
+HABITS = [
+    "Drink a glass of water after waking up",
+    "Walk for 30 minutes",
+    "Eat two servings of vegetables at lunch",
+    "Do five minutes of breathing exercises",
+    "Turn off screens an hour before bed",
+]
+PLAN_TEXT = "**Sleep:**\n- Keep a consistent bedtime.\n\n" * 40
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))] if values else None
+
+
+def summary(samples):
+    return {
+        "n": len(samples),
+        "mean_ms": sum(samples) / len(samples) * 1000,
+        "p50_ms": percentile(samples, 0.5) * 1000,
+        "p95_ms": percentile(samples, 0.95) * 1000,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return None
+
+
+# ========== FIXTURES ==========
+def make_workdir(tmp):
+    # The app reads static/, pages/ and data/ relative to the working directory: link the code
+    # in, and give every run its own empty data/ directory
+    for name in ["app.py", "pages", "static", "utils", "views", ".streamlit"]:
+        if os.path.exists(os.path.join(ROOT, name)):
+            os.symlink(os.path.join(ROOT, name), os.path.join(tmp, name))
+    os.makedirs(os.path.join(tmp, "data"))
+    for name in ["testimonials.json"]:
+        if os.path.exists(os.path.join(ROOT, "data", name)):
+            shutil.copy(os.path.join(ROOT, "data", name), os.path.join(tmp, "data", name))
+
+
+def make_record(history, days, rng):
+    start = date.today() - timedelta(days=days)
+    return {
+        "name": "Bench", "age": 42, "gender": "Prefer not to say", "activity": "Moderate",
+        "sleep": "Average", "stress": "Moderate", "diet": "Standard", "goals": "more energy",
+        "user_email": "bench@example.com", "onboarding_complete": True,
+        "history": [f"Plan {i}\n\n{PLAN_TEXT}" for i in range(history)],
+        "habits": HABITS,
+        "scores": {"Sleep": 60, "Diet": 60, "Exercise": 60, "Stress": 60},
+        "checkins": [
+            {"date": (start + timedelta(days=i)).isoformat(), "checked": [rng.random() < 0.7 for _ in HABITS]}
+            for i in range(days)
+        ],
+    }
+
+
+def share_script_cache():
+    # AppTest compiles the script on every run; the real server compiles it once per process.
+    # One shared ScriptCache gives server-like rerun costs (and avoids concurrent compiles).
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    from streamlit.testing.v1 import app_test, local_script_runner
+
+    shared = ScriptCache()
+    app_test.ScriptCache = local_script_runner.ScriptCache = lambda: shared
+
+
+def new_session(username, secrets):
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(os.path.abspath(PAGE), default_timeout=60)
+    at.secrets["sendgrid"] = secrets
+    at.session_state["username"] = username
+    at.session_state["onboarding_complete"] = True
+    return at
+
+
+def timed_run(at):
+    start = time.perf_counter()
+    at.run()
+    elapsed = time.perf_counter() - start
+    if at.exception:
+        raise RuntimeError(at.exception[0].message)
+    return elapsed
+
+
+def open_tab(at, label):
+    # Only the open tab of the page runs (key "main_tab"); a tab switch is a rerun of its own
+    at.session_state["main_tab"] = next(t.label for t in at.tabs if label in t.label)
+    return timed_run(at)
+
+
+def click(at, label):
+    next(b for b in at.button if label in b.label).click()
+    return timed_run(at)
+
+
+# ========== SCENARIOS ==========
+def bench_rerun(store, secrets, reruns, days):
+    from streamlit.testing.v1 import AppTest
+
+    rng = random.Random(0)
+    store.save_user("rerun_user", make_record(3, days, rng))
+    results = {}
+
+    landing = AppTest.from_file(os.path.abspath("app.py"), default_timeout=60)
+    results["landing_cold"] = timed_run(landing) * 1000
+    results["landing_warm"] = summary([timed_run(landing) for _ in range(reruns)])
+
+    at = new_session("rerun_user", secrets)
+    results["page_cold"] = timed_run(at) * 1000
+    results["page_warm"] = summary([timed_run(at) for _ in range(reruns)])
+    results["progress_tab"] = open_tab(at, "Progress") * 1000
+    open_tab(at, "Tracker")
+    results["checkin"] = click(at, "Check-in") * 1000
+
+    from utils import outbox
+
+    open_tab(at, "Export")
+    start = time.perf_counter()
+    results["email_rerun"] = click(at, "Send Plan via Email") * 1000
+    while outbox.queue_depth():
+        time.sleep(0.01)
+    results["email_delivered"] = (time.perf_counter() - start) * 1000
+    return results
+
+
+def bench_memory(store, secrets, sessions, days):
+    # Live AppTest sessions each hold their own session state; process-wide caches are shared
+    rng = random.Random(1)
+    for i in range(sessions + 1):
+        store.save_user(f"mem_user_{i}", make_record(3, days, rng))
+    warm = new_session("mem_user_0", secrets)
+    timed_run(warm)
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    live = []
+    for i in range(1, sessions + 1):
+        at = new_session(f"mem_user_{i}", secrets)
+        timed_run(at)
+        live.append(at)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "sessions": sessions,
+        "per_session_kb": (current - base) / sessions / 1024,
+        "peak_kb": (peak - base) / 1024,
+    }
+
+
+def bench_storage(user_counts, history_lengths, days, repeat):
+    from utils.storage import JSONFileUserStore, SQLiteUserStore
+
+    rng = random.Random(2)
+    results = []
+    for backend in ["sqlite", "json"]:
+        for n_users in user_counts:
+            for history in history_lengths:
+                with tempfile.TemporaryDirectory() as tmp:
+                    if backend == "json":
+                        store = JSONFileUserStore(os.path.join(tmp, "users.json"), os.path.join(tmp, "blobs"))
+                    else:
+                        store = SQLiteUserStore(os.path.join(tmp, "users.db"))
+                    record = make_record(history, days, rng)
+                    if backend == "json":
+                        # One write for the whole file; the legacy layout re-reads it per call, so fewer repeats
+                        store._save_all({f"user_{i}": record for i in range(n_users)})
+                        calls = max(3, repeat // 10)
+                    else:
+                        for i in range(n_users):
+                            store.save_user(f"user_{i}", record)
+                        calls = repeat
+                    names = [f"user_{rng.randrange(n_users)}" for _ in range(calls)]
+                    start = time.perf_counter()
+                    for name in names:
+                        store.load_user(name)
+                    load = (time.perf_counter() - start) / calls
+                    entry = {"date": date.today().isoformat(), "checked": [True] * len(HABITS)}
+                    start = time.perf_counter()
+                    for name in names:
+                        store.update_user(name, lambda data: data["checkins"].append(entry))
+                    update = (time.perf_counter() - start) / calls
+                    results.append({
+                        "backend": backend, "users": n_users, "history": history,
+                        "record_kb": len(json.dumps(record)) / 1024,
+                        "load_ms": load * 1000, "update_ms": update * 1000,
+                    })
+                    print(f"   storage {backend:>6} users={n_users:<5} history={history:<3} "
+                          f"load {load * 1000:.2f}ms update {update * 1000:.2f}ms")
+    return results
+
+
+def bench_sessions(store, secrets, concurrency, reruns, days):
+    rng = random.Random(3)
+    results = []
+    for k in concurrency:
+        sessions = []
+        for i in range(k):
+            store.save_user(f"load_user_{k}_{i}", make_record(3, days, rng))
+            at = new_session(f"load_user_{k}_{i}", secrets)
+            timed_run(at)
+            sessions.append(at)
+        latencies, errors = [], []
+        lock = threading.Lock()
+
+        def drive(at):
+            for _ in range(reruns):
+                try:
+                    elapsed = timed_run(at)
+                except Exception as e:
+                    with lock:
+                        errors.append(str(e))
+                    continue
+                with lock:
+                    latencies.append(elapsed)
+
+        threads = [threading.Thread(target=drive, args=(at,)) for at in sessions]
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - start
+        result = {"sessions": k, "reruns_per_sec": len(latencies) / elapsed, "errors": len(errors), **summary(latencies)}
+        results.append(result)
+        print(f"   sessions k={k:<3} {result['reruns_per_sec']:.1f} reruns/sec, p95 {result['p95_ms']:.0f}ms")
+    return results
+
+
+# ========== COMPARISON ==========
+def flatten(data, prefix=""):
+    out = {}
+    if isinstance(data, dict):
+        for key, value in data.items():
+            out.update(flatten(value, f"{prefix}{key}."))
+    elif isinstance(data, list):
+        for i, value in enumerate(data):
+            label = ",".join(f"{k}={value[k]}" for k in ("backend", "users", "history", "sessions") if isinstance(value, dict) and k in value)
+            out.update(flatten(value, f"{prefix}{label or i}."))
+    elif isinstance(data, (int, float)) and not isinstance(data, bool):
+        out[prefix.rstrip(".")] = data
+    return out
+
+
+def compare(old_path, new):
+    with open(old_path) as f:
+        old = flatten(json.load(f)["results"])
+    current = flatten(new["results"])
+    print(f"\nChange vs {old_path}:")
+    for key, value in current.items():
+        if key in old and old[key] and not key.endswith((".n", ".users", ".history", ".sessions")):
+            print(f"   {key:<55} {old[key]:>10.2f} -> {value:>10.2f} ({(value - old[key]) / old[key]:+.0%})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless end-to-end benchmarks for the EverAge app")
+    parser.add_argument("--reruns", type=int, default=20, help="warm reruns per latency measurement")
+    parser.add_argument("--days", type=int, default=365, help="check-in history of the seeded users")
+    parser.add_argument("--sessions", type=int, default=10, help="live sessions for the memory measurement")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--users", type=int, nargs="+", default=[100, 1000])
+    parser.add_argument("--history", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--quick", action="store_true", help="small sizes, for a smoke run")
+    parser.add_argument("--output", help="results file (default: benchmarks/results/<time>-<commit>.json)")
+    parser.add_argument("--compare", help="earlier results file to diff against")
+    args = parser.parse_args()
+    if args.quick:
+        args.reruns, args.sessions, args.concurrency, args.users, args.history = 5, 3, [1, 4], [100], [1, 10]
+
+    from tools.fake_sendgrid_server import start_server
+
+    sendgrid, sendgrid_url, _ = start_server()
+    # Read at import time by the app's modules, so set before anything imports them
+    os.environ.update(EVERAGE_AI_BACKEND="stub", EVERAGE_SENDGRID_URL=sendgrid_url)
+    secrets = {"api_key": "bench", "from_email": "bench@example.com"}
+
+    share_script_cache()
+    cwd = os.getcwd()
+    output = os.path.abspath(args.output) if args.output else None
+    with tempfile.TemporaryDirectory() as tmp:
+        make_workdir(tmp)
+        os.chdir(tmp)
+        try:
+            from utils.storage import get_store
+
+            store = get_store()
+            results = {}
+            print("⏱️ rerun latency...")
+            results["rerun"] = bench_rerun(store, secrets, args.reruns, args.days)
+            print("🧠 memory per session...")
+            results["memory"] = bench_memory(store, secrets, args.sessions, args.days)
+            print("💾 storage cost...")
+            results["storage"] = bench_storage(args.users, args.history, args.days, repeat=50)
+            print("👥 concurrent sessions...")
+            results["sessions"] = bench_sessions(store, secrets, args.concurrency, args.reruns, args.days)
+        finally:
+            os.chdir(cwd)
+    sendgrid.shutdown()
+
+    commit = git_commit()
+    report = {
+        "commit": commit,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "args": vars(args),
+        "results": results,
+    }
+    if output is None:
+        os.makedirs(os.path.join(ROOT, "benchmarks", "results"), exist_ok=True)
+        output = os.path.join(ROOT, "benchmarks", "results", f"{time.strftime('%Y%m%d-%H%M%S')}-{commit or 'nogit'}.json")
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    rerun = results["rerun"]
+    print(f"✅ page warm rerun p50 {rerun['page_warm']['p50_ms']:.0f}ms, "
+          f"{results['memory']['per_session_kb']:.0f} KB/session -> {output}")
+    if args.compare:
+        compare(args.compare, report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import ai_backends, ai_cache
+from utils.ai_async import generate_plan
+from utils.plan_index import SIMILARITY_THRESHOLD, PlanIndex, profile_prompt
+
+# Replays a stream of synthetic plan requests through the plan index, with the stub backend
+# standing in for the model, and reports hit rate and time saved versus always generating.
+#
+#   python benchmarks/plan_reuse_bench.py --requests 500 --latency 0.2 --threshold 0.9
+
+GOALS = [
+    "more energy", "have more energy during the day", "lose weight", "lose some weight and sleep better",
+    "sleep better", "reduce stress", "reduce stress at work", "build muscle", "live longer",
+    "improve my heart health", "lower my blood pressure", "feel less tired in the afternoon",
+]
+
+
+def random_profile(rng):
+    # Skewed towards the common answers, like real sign-ups
+    return {
+        "age": min(80, max(18, int(rng.gauss(42, 12)))),
+        "activity": rng.choices(["Low", "Moderate", "High"], [3, 5, 2])[0],
+        "sleep": rng.choices(["Poor", "Average", "Good"], [3, 5, 2])[0],
+        "stress": rng.choices(["High", "Moderate", "Low"], [4, 4, 2])[0],
+        "diet": rng.choices(["Standard", "Vegetarian", "Keto", "Mediterranean"], [6, 2, 1, 1])[0],
+        "goals": rng.choice(GOALS),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hit rate and latency savings of nearest-neighbour plan reuse")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.2, help="simulated model latency per call")
+    parser.add_argument("--threshold", type=float, default=SIMILARITY_THRESHOLD)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    ai_backends.set_backend("stub")
+    ai_backends.get_backend().latency = args.latency
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        # Disable the exact-match response cache so only the plan index can avoid a model call
+        ai_cache._cache.set(ai_cache.ResponseCache(os.path.join(tmp, "cache.db"), max_entries=0))
+        index = PlanIndex(os.path.join(tmp, "plans.db"), threshold=args.threshold)
+        start = time.perf_counter()
+        for _ in range(args.requests):
+            profile = random_profile(rng)
+            if index.lookup(profile):
+                continue
+            t = time.perf_counter()
+            plan, habits, scores = generate_plan(profile_prompt(profile), bypass_cache=True)
+            index.add(profile, plan, habits, scores, generation_seconds=time.perf_counter() - t)
+        elapsed = time.perf_counter() - start
+        stats = index.stats()
+
+    baseline = args.requests * stats["avg_generation_seconds"]
+    print(f"{args.requests} requests: {stats['hits']} served from the index ({stats['hit_rate']:.0%}), "
+          f"{stats['misses']} generated, {stats['entries']} plans stored")
+    print(f"lookup {stats['avg_lookup_ms']:.2f}ms avg, generation {stats['avg_generation_seconds']:.2f}s avg")
+    print(f"wall time {elapsed:.1f}s vs ~{baseline:.1f}s always generating "
+          f"(saved ~{stats['saved_seconds']:.1f}s, {ai_backends.backend_stats()['stub']['calls']} model calls)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+from app_bench import PAGE, make_record, make_workdir
+
+# Cold start of the main page: every sample is a fresh interpreter (like a new server process)
+# that renders the page once for a logged-in user, so module imports are part of the cost.
+# Reports the median first-run time, which heavy libraries that run pulled in, and the
+# slowest top-level imports from python -X importtime.
+#
+#   python benchmarks/startup_bench.py
+#   python benchmarks/startup_bench.py --runs 10 --top 20
+
+HEAVY_MODULES = ["openai", "requests", "matplotlib", "matplotlib.pyplot", "pandas", "numpy", "fpdf", "PIL.Image"]
+
+CHILD = """
+import json, os, sys, time
+start = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+loaded = time.perf_counter()
+at = AppTest.from_file(os.path.abspath({page!r}), default_timeout=120)
+at.secrets["sendgrid"] = {{"api_key": "bench", "from_email": "bench@example.com"}}
+at.session_state["username"] = "startup_user"
+at.session_state["onboarding_complete"] = True
+at.run()
+end = time.perf_counter()
+print(json.dumps({{
+    "streamlit_ms": (loaded - start) * 1000,
+    "first_run_ms": (end - loaded) * 1000,
+    "heavy": [m for m in {heavy!r} if m in sys.modules],
+    "error": at.exception[0].message if at.exception else None,
+}}))
+"""
+
+
+def run_child(workdir, importtime=False):
+    cmd = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", CHILD.format(page=PAGE, heavy=HEAVY_MODULES)]
+    env = dict(os.environ, EVERAGE_AI_BACKEND="stub")
+    proc = subprocess.run(cmd, cwd=workdir, env=env, capture_output=True, text=True)
+    if proc.returncode:
+        raise RuntimeError(proc.stderr[-2000:])
+    return json.loads(proc.stdout.strip().splitlines()[-1]), proc.stderr
+
+
+def top_imports(importtime_log, top):
+    # Top-level imports only (no leading indent in the module column), by cumulative time
+    rows = []
+    for line in importtime_log.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, module = line.split("|", 2)
+        if module.startswith(" ") and not module.startswith("  "):
+            rows.append((int(cumulative), module.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold-start time of the main page in fresh interpreters")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="slowest top-level imports to list")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        make_workdir(tmp)
+        sys.path.insert(0, ROOT)
+        os.chdir(tmp)
+        from utils.storage import SQLiteUserStore
+
+        SQLiteUserStore().save_user("startup_user", make_record(3, 365, random.Random(0)))
+
+        samples = [run_child(tmp)[0] for _ in range(args.runs)]
+        _, log = run_child(tmp, importtime=True)
+        os.chdir(ROOT)
+
+    errors = [s["error"] for s in samples if s["error"]]
+    if errors:
+        print(f"❌ Page raised: {errors[0]}")
+        sys.exit(1)
+    first_run = sorted(s["first_run_ms"] for s in samples)[len(samples) // 2]
+    streamlit_ms = sorted(s["streamlit_ms"] for s in samples)[len(samples) // 2]
+    print(f"🚀 first page run {first_run:.0f}ms (median of {args.runs}), streamlit import {streamlit_ms:.0f}ms")
+    print(f"   heavy modules loaded: {', '.join(samples[0]['heavy']) or 'none'}")
+    print(f"   slowest top-level imports (cumulative):")
+    for cumulative, module in top_imports(log, args.top):
+        print(f"   {cumulative / 1000:8.1f}ms  {module}")
+
+
+if __name__ == "__main__":
+    main()
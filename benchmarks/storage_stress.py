@@ -0,0 +1,160 @@
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from multiprocessing import Process
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+from utils import storage
+from utils.storage import CachedUserStore, JSONFileUserStore, SQLiteUserStore
+
+# Runs N writer processes that all append check-ins to the same user at once,
+# then checks that every single check-in made it to disk, once with full-record updates
+# and once with appended events (which also exercises compaction). A last pass runs writer and
+# reader threads (like Streamlit sessions) against the cached store and checks that the
+# cached record ends up identical to the one on disk. Finally a check-in is submitted from the
+# page's Tracker tab (headless, via AppTest) against each store with and without the record cache
+# (EVERAGE_USER_CACHE_SIZE=0), and must be saved and shown.
+#
+#   python benchmarks/storage_stress.py --writers 8 --checkins 50 --backend sqlite
+
+
+def make_store(backend, path):
+    if backend == "json":
+        return JSONFileUserStore(path)
+    return SQLiteUserStore(path)
+
+
+def writer(backend, path, writer_id, checkins, events=False):
+    store = make_store(backend, path)
+    for i in range(checkins):
+        entry = {"date": "2025-01-01", "checked": [True], "writer": writer_id, "seq": i}
+        if events:
+            store.append_events("stress_user", [{"op": "append", "field": "checkins", "value": entry}])
+        else:
+            store.update_user("stress_user", lambda data: data.setdefault("checkins", []).append(entry))
+
+
+def run(backend, writers, checkins, events=False):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "store.json" if backend == "json" else "store.db")
+        make_store(backend, path)
+
+        start = time.perf_counter()
+        procs = [Process(target=writer, args=(backend, path, w, checkins, events)) for w in range(writers)]
+        for p in procs:
+            p.start()
+        for p in procs:
+            p.join()
+        elapsed = time.perf_counter() - start
+
+        saved = make_store(backend, path).load_user("stress_user").get("checkins", [])
+        expected = {(w, i) for w in range(writers) for i in range(checkins)}
+        found = {(c["writer"], c["seq"]) for c in saved}
+        lost = expected - found
+
+        total = writers * checkins
+        label = f"{backend} (events)" if events else backend
+        print(f"{label}: {len(found)}/{total} check-ins kept, {total / elapsed:.0f} writes/sec")
+        if lost or len(saved) != total:
+            print(f"❌ {len(lost)} check-ins lost, {len(saved) - len(found)} duplicated")
+            return False
+        print("✅ No check-ins lost")
+        return True
+
+
+def run_cached(backend, writers, checkins):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "store.json" if backend == "json" else "store.db")
+        store = CachedUserStore(make_store(backend, path))
+        done = threading.Event()
+
+        def write(writer_id):
+            for i in range(checkins):
+                entry = {"date": "2025-01-01", "checked": [True], "writer": writer_id, "seq": i}
+                store.update_user("stress_user", lambda data: data.setdefault("checkins", []).append(entry))
+
+        def read():
+            while not done.is_set():
+                store.load_user("stress_user")
+
+        readers = [threading.Thread(target=read) for _ in range(writers)]
+        threads = [threading.Thread(target=write, args=(w,)) for w in range(writers)]
+        for t in readers + threads:
+            t.start()
+        for t in threads:
+            t.join()
+        done.set()
+        for t in readers:
+            t.join()
+
+        cached = store.load_user("stress_user")
+        on_disk = make_store(backend, path).load_user("stress_user")
+        stats = store.stats()
+        print(f"{backend} (cached): {len(on_disk.get('checkins', []))}/{writers * checkins} check-ins on disk, "
+              f"{stats['hits']} cache hits / {stats['misses']} misses")
+        if cached != on_disk:
+            print("❌ Cached record differs from the stored one")
+            return False
+        print("✅ Cache matches disk")
+        return True
+
+
+def run_tracker(backend, cached):
+    from app_bench import make_record, make_workdir, new_session, open_tab, click
+    import random
+
+    label = f"{backend} ({'cached' if cached else 'uncached'})"
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        make_workdir(tmp)
+        os.chdir(tmp)
+        try:
+            path = os.path.join("data", "store.json" if backend == "json" else "store.db")
+            raw = make_store(backend, path)
+            record = make_record(1, 30, random.Random(0))
+            raw.save_user("tracker_user", record)
+            storage._store.set(CachedUserStore(raw) if cached else raw)
+
+            at = new_session("tracker_user", {"api_key": "stress", "from_email": "stress@example.com"})
+            at.run()
+            open_tab(at, "Tracker")
+            at.checkbox[0].check()
+            click(at, "Check-in")
+            saved = make_store(backend, path).load_user("tracker_user")
+        except Exception as e:
+            print(f"{label} tracker: ❌ {type(e).__name__}: {e}")
+            return False
+        finally:
+            storage._store.set(None)
+            os.chdir(cwd)
+    expected = len(record["checkins"]) + 1
+    ok = len(saved["checkins"]) == expected and len(at.session_state.checkins) == expected and at.success
+    print(f"{label} tracker: {len(saved['checkins'])}/{expected} check-ins saved")
+    print("✅ Check-in saved from the page" if ok else "❌ Check-in not saved or not shown")
+    return bool(ok)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent writer stress test for utils/storage.py")
+    parser.add_argument("--backend", choices=["sqlite", "json", "all"], default="all")
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--checkins", type=int, default=50)
+    args = parser.parse_args()
+
+    backends = ["sqlite", "json"] if args.backend == "all" else [args.backend]
+    ok = all([run(b, args.writers, args.checkins) for b in backends])
+    ok = all([run(b, args.writers, args.checkins, events=True) for b in backends]) and ok
+    ok = all([run_cached(b, args.writers, args.checkins) for b in backends]) and ok
+    os.environ.setdefault("EVERAGE_AI_BACKEND", "stub")
+    ok = all([run_tracker(b, cached) for b in backends for cached in (False, True)]) and ok
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.habits import habit_id
+from utils.streaks import apply_checkin, rebuild_streaks, streaks_match
+
+# Cost of keeping streaks current as check-in history grows. "rebuild" is what every Progress
+# rerun used to pay; "rerun" (validate stored state) and "checkin" (O(1) update) should stay flat.
+#
+#   python benchmarks/streaks_bench.py --years 1 3 5 10
+
+HABITS = [f"Habit {i}" for i in range(5)]
+HABIT_SETS = [[habit_id(h) for h in HABITS]]
+
+
+def make_history(days):
+    start = date(2020, 1, 1)
+    return [
+        {"date": (start + timedelta(days=i)).isoformat(), "checked": [random.random() < 0.8 for _ in HABITS]}
+        for i in range(days)
+    ]
+
+
+def per_call(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Streak cost per rerun vs history length")
+    parser.add_argument("--years", type=int, nargs="+", default=[1, 3, 5, 10])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    random.seed(0)
+    print(f"{'days':>6} {'rebuild µs':>12} {'rerun µs':>10} {'checkin µs':>11}")
+    for years in args.years:
+        checkins = make_history(365 * years)
+        streaks = rebuild_streaks(checkins, HABIT_SETS)
+        next_day = date.fromisoformat(checkins[-1]["date"])
+
+        rebuild = per_call(lambda: rebuild_streaks(checkins, HABIT_SETS), max(1, args.repeat // 20))
+        rerun = per_call(lambda: streaks_match(streaks, HABIT_SETS[-1]), args.repeat)
+
+        def checkin():
+            nonlocal next_day
+            next_day += timedelta(days=1)
+            entry = {"date": next_day.isoformat(), "checked": [True] * len(HABITS)}
+            apply_checkin(streaks, entry, HABIT_SETS)
+
+        update = per_call(checkin, args.repeat)
+        print(f"{len(checkins):>6} {rebuild:>12.0f} {rerun:>10.2f} {update:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
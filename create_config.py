@@ -11,6 +11,10 @@ backgroundColor = "#ffffff"
 secondaryBackgroundColor = "#f0f2f6"
 textColor = "#262730"
 font = "sans serif"
+
+[server]
+# Serves ./static at app/static/ (used for the lazily loaded demo animation)
+enableStaticServing = true
 """
 
 with open(".streamlit/config.toml", "w") as f:
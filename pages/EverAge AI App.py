@@ -1,17 +1,25 @@
-import streamlit as st
-import openai
-from datetime import datetime
-import matplotlib.pyplot as plt
-from fpdf import FPDF
-import base64
-import json
 import os
-import requests
+
+import streamlit as st
+
+from utils.storage import get_store
+from utils.habits import ensure_habit_sets
+from utils.plan_history import get_plan, plan_count
+from utils.tracing import TRACING_ENABLED, counter_stats, finish_trace, recent_traces, stage_stats, start_trace
+from utils import assets
+from views.common import append_user_events, load_user_data, update_user_data
+
+# Each tab lives in views/ and is imported (with its heavy libraries) only when it is open;
+# python benchmarks/startup_bench.py measures the cold start.
 
 # ========== CONFIGURATION ==========
-openai.api_key = st.secrets["openai"]["api_key"]
 st.set_page_config(page_title="EverAge: Longevity Copilot", layout="wide")
-DATA_FILE = "data/user_data.json"
+# Usernames that get the rerun timings panel in the sidebar (comma-separated)
+ADMIN_USERS = {u.strip().lower() for u in os.environ.get("EVERAGE_ADMINS", "").split(",") if u.strip()}
+
+# Per-rerun stage timings (utils/tracing.py, EVERAGE_TRACING=1); a no-op when tracing is off
+trace = start_trace("EverAge AI App", previous=st.session_state.get("_trace"))
+st.session_state._trace = trace
 
 # ========== PUBLIC PREVIEW MODE SUPPORT ==========
 if st.session_state.get("demo_mode"):
@@ -100,45 +108,14 @@ if "_rerun_trigger" in st.session_state and st.session_state._rerun_trigger:
     st.session_state._rerun_trigger = False
     st.rerun()
 
-# ========== EMAIL FUNCTION ==========
-def send_email_with_pdf(to_email, pdf_path):
-    with open(pdf_path, "rb") as f:
-        file_data = base64.b64encode(f.read()).decode()
-
-    data = {
-        "personalizations": [{
-            "to": [{"email": to_email}],
-            "subject": "Your EverAge Longevity Plan 📄"
-        }],
-        "from": {
-            "email": st.secrets["sendgrid"]["from_email"]
-        },
-        "content": [{
-            "type": "text/plain",
-            "value": "Hi! Here’s your personalized EverAge longevity plan attached as a PDF. 🙊"
-        }],
-        "attachments": [{
-            "content": file_data,
-            "type": "application/pdf",
-            "filename": "longevity_plan.pdf"
-        }]
-    }
-
-    response = requests.post(
-        "https://api.sendgrid.com/v3/mail/send",
-        headers={
-            "Authorization": f"Bearer {st.secrets['sendgrid']['api_key']}",
-            "Content-Type": "application/json"
-        },
-        json=data
-    )
-    return response.status_code == 202
-
 # ========== PLAN HISTORY VIEWER ==========
+# Only the latest plans live in the record; older ones are fetched from the archive when picked
 if st.session_state.get("history"):
     st.markdown("### 📜 View Previous Plans")
-    selected_index = st.selectbox("Select a Plan", list(range(len(st.session_state.history))), format_func=lambda i: f"Plan {i + 1}")
-    st.markdown(st.session_state.history[selected_index])
+    hot, archive = st.session_state.history, st.session_state.get("history_archive", [])
+    total = plan_count(hot, archive)
+    selected_index = st.selectbox("Select a Plan", list(range(total)), index=total - 1, format_func=lambda i: f"Plan {i + 1}")
+    st.markdown(get_plan(get_store(), hot, archive, selected_index) or "_This plan is no longer available._")
 
 # ========== STREAK MILESTONE CELEBRATION FIX ==========
 # Replace inside Progress tab loop
@@ -160,34 +137,35 @@ if not username:
 st.markdown(f"👋 Hello, **{username}**! Let’s keep you living long and strong.")
 
 
-# ========== DATA LOAD/SAVE ==========
-def load_all_user_data():
-    if os.path.exists(DATA_FILE):
-        with open(DATA_FILE, "r") as f:
-            return json.load(f)
-    return {}
-
-def save_all_user_data(all_data):
-    with open(DATA_FILE, "w") as f:
-        json.dump(all_data, f, indent=2)
-
-def load_user_data():
-    return load_all_user_data().get(username, {}) or {}
-
-def save_user_data(user_data):
-    all_data = load_all_user_data()
-    all_data[username] = user_data
-    save_all_user_data(all_data)
-
 # ========== SESSION STATE INIT ==========
-user_data = load_user_data()
-st.session_state.setdefault("onboarding_complete", user_data.get("onboarding_complete", False))
-st.session_state.setdefault("onboarding_step", 0)
-st.session_state.setdefault("history", user_data.get("history", []))
-st.session_state.setdefault("habits", user_data.get("habits", []))
-st.session_state.setdefault("scores", user_data.get("scores", {}))
-st.session_state.setdefault("checkins", user_data.get("checkins", []))
-st.session_state.setdefault("user_email", user_data.get("user_email", ""))
+# User records are read and written through views/common.py (see utils/storage.py)
+user_data = load_user_data(username)
+if "habit_sets" not in user_data and user_data.get("habits"):
+    # One-off migration of a record from before habit-set versions (see utils/habits.py)
+    user_data = update_user_data(username, ensure_habit_sets)
+# Seeded once per session (and user); later reruns keep the session's own values. Switching users
+# first drops everything held for the previous one, including derived state such as the check-in
+# matrix and a pending email, so nothing of theirs is shown or written to the new record.
+USER_SESSION_KEYS = [
+    "onboarding_complete", "onboarding_step", "history", "history_archive", "habits", "habit_sets",
+    "scores", "checkins", "streaks", "user_email", "checkin_matrix", "email_outbox_id",
+    "email_outbox_done", "email_send_nonce",
+]
+if st.session_state.get("_session_user") != username:
+    if st.session_state.get("_session_user") is not None:
+        for key in USER_SESSION_KEYS:
+            st.session_state.pop(key, None)
+    st.session_state.setdefault("onboarding_complete", user_data.get("onboarding_complete", False))
+    st.session_state.setdefault("onboarding_step", 0)
+    st.session_state.setdefault("history", user_data.get("history", []))
+    st.session_state.setdefault("history_archive", user_data.get("history_archive", []))
+    st.session_state.setdefault("habits", user_data.get("habits", []))
+    st.session_state.setdefault("habit_sets", user_data.get("habit_sets", []))
+    st.session_state.setdefault("scores", user_data.get("scores", {}))
+    st.session_state.setdefault("checkins", user_data.get("checkins", []))
+    st.session_state.setdefault("streaks", user_data.get("streaks", {}))
+    st.session_state.setdefault("user_email", user_data.get("user_email", ""))
+    st.session_state._session_user = username
 
 # ========== ONBOARDING FLOW ==========
 def run_onboarding():
@@ -230,7 +208,7 @@ def run_onboarding():
                 "user_email": st.session_state.user_email,
                 "onboarding_complete": True
             }
-            save_user_data({**user_data, **profile})
+            append_user_events(username, {"op": "set", "fields": profile})
             st.session_state.onboarding_complete = True
             st.session_state._rerun_trigger = True
             st.rerun()
@@ -261,7 +239,7 @@ def show_score_metrics(scores):
 
 
 # ========== SIDEBAR PROFILE ==========
-st.sidebar.image("static/everage_icon.png", width=80)  # 🌀 Icon-only logo
+st.sidebar.image(assets.image("static/everage_icon.png", 80), width=80)  # 🌀 Icon-only logo
 st.sidebar.markdown("---")
 st.sidebar.markdown("### 👤 Your Profile")
 st.sidebar.markdown(f"**👤 Name:** {user_data.get('name', 'N/A')}")
@@ -274,203 +252,63 @@ if st.sidebar.button("✏️ Edit Profile"):
     st.session_state._rerun_trigger = True
 
 # ========== MAIN SCREEN LOGO ==========
-st.image("static/everage_full_logo.png", width=300)  # 🧬 Full logo on homepage
-
-
-
-
-
-# ========== AI FUNCTIONS ==========
-def get_ai_plan(prompt):
-    structured_prompt = f"{prompt}\n\nPlease return a clearly formatted longevity plan with these sections:\n- Sleep\n- Exercise\n- Diet\n- Stress Management\nInclude 5 daily habits in a section titled 'Daily Habits'."
-    response = openai.chat.completions.create(
-        model="gpt-3.5-turbo",
-        messages=[
-            {"role": "system", "content": "You are a longevity coach..."},
-            {"role": "user", "content": structured_prompt}
-        ]
-    )
-    return response.choices[0].message.content.strip()
-
-def extract_habits(plan_text):
-    response = openai.chat.completions.create(
-        model="gpt-3.5-turbo",
-        messages=[
-            {"role": "system", "content": "Extract exactly 5 clear habits."},
-            {"role": "user", "content": plan_text}
-        ]
-    )
-    return [line.strip("•- ").strip() for line in response.choices[0].message.content.strip().split("\n") if line.strip()][:5]
-
-def calculate_scores(prompt):
-    response = openai.chat.completions.create(
-        model="gpt-3.5-turbo",
-        messages=[
-            {"role": "system", "content": "Score Sleep, Diet, Exercise, Stress (0-100)."},
-            {"role": "user", "content": prompt}
-        ]
-    )
-    lines = response.choices[0].message.content.split("\n")
-    scores = {}
-    for line in lines:
-        if ":" in line:
-            k, v = line.split(":", 1)
-            try:
-                scores[k.strip()] = int(v.strip())
-            except:
-                pass
-    return scores
-
-def calculate_streaks(checkins, habits):
-    streaks = {h: {"current": 0, "best": 0} for h in habits}
-    log = {h: [] for h in habits}
-    for entry in checkins:
-        d = datetime.strptime(entry["date"], "%Y-%m-%d").date()
-        for i, done in enumerate(entry["checked"]):
-            log[habits[i]].append((d, done))
-    for h, l in log.items():
-        l.sort()
-        cur = best = 0
-        prev = None
-        for d, done in l:
-            if done:
-                cur = cur + 1 if prev and (d - prev).days == 1 else 1
-                best = max(best, cur)
-            else:
-                cur = 0
-            prev = d
-        streaks[h] = {"current": cur, "best": best}
-    return streaks
+st.image(assets.image("static/everage_full_logo.png", 300), width=300)  # 🧬 Full logo on homepage
 
-# ========== MAIN TABS ==========
-st.title("🧬 EverAge: Your Longevity Copilot")
-tabs = st.tabs(["📝 Create Plan", "✅ Tracker", "📈 Progress", "📄 Export"])
-
-# --- Tab 1: Create Plan ---
-with tabs[0]:
-    st.subheader("Tell us about yourself 🧠")
-    age = st.number_input("Age", min_value=18, max_value=100, value=user_data.get("age", 30))
-    activity = st.selectbox("Activity Level", ["Low", "Moderate", "High"], index=["Low", "Moderate", "High"].index(user_data.get("activity", "Moderate")))
-    sleep = st.selectbox("Sleep Quality", ["Poor", "Average", "Good"], index=["Poor", "Average", "Good"].index(user_data.get("sleep", "Average")))
-    stress = st.selectbox("Stress Level", ["High", "Moderate", "Low"], index=["High", "Moderate", "Low"].index(user_data.get("stress", "Moderate")))
-    diet = st.selectbox("Diet Type", ["Standard", "Vegetarian", "Keto", "Mediterranean"], index=["Standard", "Vegetarian", "Keto", "Mediterranean"].index(user_data.get("diet", "Standard")))
-    goals = st.text_area("Health Goals", value=user_data.get("goals", ""))
-    email = st.text_input("Your Email", value=st.session_state.user_email)
-
-    if st.button("🧪 Generate My Longevity Plan"):
-        prompt = f"Age: {age}, Activity: {activity}, Sleep: {sleep}, Stress: {stress}, Diet: {diet}, Goals: {goals}"
-        plan = get_ai_plan(prompt)
-        st.session_state.history.append(plan)
-        st.session_state.habits = extract_habits(plan)
-        st.session_state.scores = calculate_scores(prompt)
-        st.session_state.user_email = email
-        save_user_data({
-            **user_data,
-            "history": st.session_state.history,
-            "habits": st.session_state.habits,
-            "scores": st.session_state.scores,
-            "checkins": st.session_state.checkins,
-            "user_email": email
-        })
-        st.success("✅ Plan created!")
-        st.markdown(plan)
-
-    if st.button("♻️ Regenerate My Plan") and st.session_state.history:
-        prompt = f"Age: {age}, Activity: {activity}, Sleep: {sleep}, Stress: {stress}, Diet: {diet}, Goals: {goals}"
-        plan = get_ai_plan(prompt)
-        st.session_state.history[-1] = plan
-        st.session_state.habits = extract_habits(plan)
-        st.session_state.scores = calculate_scores(prompt)
-        st.markdown(plan)
-
-# --- Tab 2: Daily Tracker ---
-with tabs[1]:
-    st.subheader("🗓️ Daily Check-in")
-    if st.session_state.habits:
-        today = datetime.now().strftime("%Y-%m-%d")
-        checks = [st.checkbox(h, key=f"chk_{i}") for i, h in enumerate(st.session_state.habits)]
-        if st.button("Submit Today’s Check-in"):
-            st.session_state.checkins.append({"date": today, "checked": checks})
-            save_user_data({
-                **user_data,
-                "history": st.session_state.history,
-                "habits": st.session_state.habits,
-                "scores": st.session_state.scores,
-                "checkins": st.session_state.checkins,
-                "user_email": st.session_state.user_email
-            })
-            st.success("📌 Check-in saved!")
-    else:
-        st.info("Please generate a plan first.")
-
-# --- Tab 3: Progress ---
-with tabs[2]:
-    st.subheader("📈 Weekly Progress")
-    
-    if not st.session_state.checkins:
-        st.info("No check-ins yet.")
-    else:
-        labels = [c["date"] for c in st.session_state.checkins]
-        values = [sum(c["checked"]) for c in st.session_state.checkins]
-        fig, ax = plt.subplots(figsize=(8, 4))
-        ax.bar(labels, values)
-        ax.set_title("📊 Weekly Habit Progress")
-        ax.set_ylabel("Habits Completed")
-        ax.set_ylim(0, 5)
-        ax.set_xticklabels(labels, rotation=45)
-        st.pyplot(fig)
-
-    if st.session_state.scores:
-        st.markdown("**🧠 Health Scores:**")
-        for k, v in st.session_state.scores.items():
-            st.progress(v / 100, text=f"{k}: {v}")
-
-    if st.session_state.habits:
-        streaks = calculate_streaks(st.session_state.checkins, st.session_state.habits)
-        st.subheader("🔥 Habit Streaks")
-        for h, s in streaks.items():
-            if s['current'] == 3:
-                st.success(f"🔥 You're on a 3-day streak for **{h}**! Keep it up!")
-            st.markdown(f"**{h}** — Current: {s['current']} 🔁 | Best: {s['best']} 🏆")
-
-
-
-
-# --- Tab 4: Export Plan ---
-with tabs[3]:
-    st.subheader("📄 Export Plan")
-    if st.session_state.history:
-        latest_plan = st.session_state.history[-1]
-        pdf = FPDF()
-        pdf.add_page()
-
-        # 🧬 Small top-right logo
-        logo_width = 30
-        margin_right = 10
-        margin_top = 8
-        page_width = pdf.w
-        logo_x = page_width - logo_width - margin_right
-        pdf.image("static/everage_full_logo.png", x=logo_x, y=margin_top, w=logo_width)
-
-        # 📝 Content below
-        pdf.set_y(28)
-        pdf.set_font("Arial", size=12)
-        pdf.multi_cell(0, 10, latest_plan)
-        pdf_path = "longevity_plan.pdf"
-        pdf.output(pdf_path)
-
-        with open(pdf_path, "rb") as f:
-            b64 = base64.b64encode(f.read()).decode()
-        href = f'<a href="data:application/octet-stream;base64,{b64}" download="longevity_plan.pdf">📄 Download Plan as PDF</a>'
-        st.markdown(href, unsafe_allow_html=True)
-
-        email_input = st.text_input("📬 Email to send to:", value=st.session_state.user_email)
-        if st.button("Send Plan via Email"):
-            if send_email_with_pdf(email_input, pdf_path):
-                st.success("✅ Email sent!")
-            else:
-                st.error("❌ Email failed.")
-    else:
-        st.info("No plan available to export.")
 
 
+
+
+# ========== MAIN TABS ==========
+st.title("🧬 EverAge: Your Longevity Copilot")
+# Only the open tab runs (on_change="rerun" reruns the page when another one is picked)
+plan_tab, tracker_tab, progress_tab, export_tab = st.tabs(
+    ["📝 Create Plan", "✅ Tracker", "📈 Progress", "📄 Export"], key="main_tab", on_change="rerun"
+)
+
+if plan_tab.open:
+    from views import plan
+    with plan_tab:
+        plan.render(username, user_data)
+
+if tracker_tab.open:
+    from views import tracker
+    with tracker_tab:
+        tracker.render(username, user_data)
+
+if progress_tab.open:
+    from views import progress
+    with progress_tab:
+        progress.render(username, user_data)
+
+if export_tab.open:
+    from views import export
+    with export_tab:
+        export.render(username, user_data)
+
+
+# ========== ADMIN: RERUN TIMINGS ==========
+def show_trace_panel():
+    with st.sidebar.expander("⏱️ Rerun timings"):
+        if not TRACING_ENABLED:
+            st.caption("Tracing is off. Start the app with EVERAGE_TRACING=1 to record stage timings.")
+            return
+        import pandas as pd
+        traces = recent_traces(10)
+        if traces:
+            st.markdown("**Last reruns (ms)**")
+            rows = [{"total": t["total"] * 1000, **{k: v * 1000 for k, v in t["stages"].items()}} for t in reversed(traces)]
+            st.dataframe(pd.DataFrame(rows).fillna(0).round(1))
+        stats = stage_stats()
+        if stats:
+            st.markdown("**Per stage (ms)**")
+            frame = pd.DataFrame(stats).T[["count", "p50", "p95", "max"]]
+            frame[["p50", "p95", "max"]] *= 1000
+            st.dataframe(frame.round(1))
+        counters = counter_stats()
+        if counters:
+            st.markdown("**Counters**")
+            st.dataframe(pd.DataFrame({"count": counters}))
+
+if username in ADMIN_USERS:
+    show_trace_panel()
+finish_trace(trace)
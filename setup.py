@@ -6,7 +6,7 @@ import json
 def install_packages():
     print("📦 Installing required packages...")
     subprocess.check_call([sys.executable, "-m", "pip", "install", "--quiet",
-                           "streamlit", "openai", "matplotlib", "pandas", "seaborn", "scikit-learn", "fpdf"])
+                           "streamlit>=1.66", "openai", "matplotlib", "pandas", "numpy", "fpdf"])
 
 def create_secrets(api_key):
     streamlit_dir = ".streamlit"
@@ -31,6 +31,10 @@ def create_data_file():
     else:
         print(f"📁 Data file already exists: {data_path}")
 
+    from utils.storage import get_store
+    get_store()
+    print("🗄️ User data store ready (existing users migrated from user_data.json)")
+
 def main():
     install_packages()
     create_data_file()
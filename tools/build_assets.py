@@ -0,0 +1,26 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.assets import DEMO_GIF, DEMO_WEBP, build_demo_webp
+
+# Pre-builds the optimised demo animation (static/demo.webp) at deploy time, so the first
+# landing-page visitors don't get the GIF while the app converts it in the background.
+#
+#   python tools/build_assets.py
+
+
+def main():
+    if not os.path.exists(DEMO_GIF):
+        print(f"🚫 {DEMO_GIF} not found")
+        sys.exit(1)
+    start = time.perf_counter()
+    build_demo_webp()
+    print(f"✅ {DEMO_WEBP}: {os.path.getsize(DEMO_WEBP) / 1e6:.1f} MB "
+          f"(was {os.path.getsize(DEMO_GIF) / 1e6:.1f} MB) in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
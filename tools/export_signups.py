@@ -0,0 +1,27 @@
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.signups import SIGNUPS_FILE, SignupRegistry
+
+# Exports the landing-page signup list (utils/signups.py) for mailing tools.
+#
+#   python tools/export_signups.py signups.csv       # email, source, first/last seen
+#   python tools/export_signups.py emails.json       # plain list, like the old data/emails.json
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export landing-page signups to CSV or JSON")
+    parser.add_argument("output", help="*.csv for full rows, anything else for a JSON list of addresses")
+    parser.add_argument("--db", default=SIGNUPS_FILE)
+    args = parser.parse_args()
+
+    registry = SignupRegistry(args.db)
+    registry.export(args.output)
+    print(f"✅ Exported {registry.count()} signups to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
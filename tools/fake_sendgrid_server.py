@@ -0,0 +1,67 @@
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Local stand-in for SendGrid's /v3/mail/send. Accepts mail with 202, can fail the first N
+# requests (503 or 429) and add latency, and keeps every accepted message for inspection.
+#
+#   python tools/fake_sendgrid_server.py --port 8766 --fail-first 2
+#   EVERAGE_SENDGRID_URL=http://127.0.0.1:8766/v3/mail/send streamlit run app.py
+
+
+class FakeSendGridHandler(BaseHTTPRequestHandler):
+    latency = 0.0
+    fail_first = 0
+    fail_status = 503
+    state = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        time.sleep(self.latency)
+        with self.state["lock"]:
+            self.state["requests"] += 1
+            failing = self.state["requests"] <= self.fail_first
+            if not failing:
+                self.state["accepted"].append(payload)
+        status = self.fail_status if failing else 202
+        self.send_response(status)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+
+def start_server(port=0, latency=0.0, fail_first=0, fail_status=503):
+    # Returns (server, url, state); state["accepted"] lists the payloads that got a 202
+    state = {"lock": threading.Lock(), "requests": 0, "accepted": []}
+    handler = type("Handler", (FakeSendGridHandler,), {
+        "latency": latency, "fail_first": fail_first, "fail_status": fail_status, "state": state,
+    })
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v3/mail/send", state
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake SendGrid mail/send endpoint")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--fail-first", type=int, default=0, help="answer the first N requests with --fail-status")
+    parser.add_argument("--fail-status", type=int, default=503)
+    args = parser.parse_args()
+    server, url, state = start_server(args.port, args.latency, args.fail_first, args.fail_status)
+    print(f"📮 Fake SendGrid listening on {url}")
+    try:
+        while True:
+            time.sleep(5)
+            print(f"   {state['requests']} requests, {len(state['accepted'])} accepted")
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
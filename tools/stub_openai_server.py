@@ -0,0 +1,166 @@
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Local stand-in for the OpenAI chat completions endpoint, with configurable latency.
+# Point the app at it with:
+#
+#   python tools/stub_openai_server.py --port 8765 --latency 1.5
+#   OPENAI_BASE_URL=http://127.0.0.1:8765/v1 OPENAI_API_KEY=stub streamlit run app.py
+
+STUB_PLAN = """**Sleep:**
+- Keep a consistent bedtime and wake time.
+
+**Exercise:**
+- Walk 30 minutes a day and add two strength sessions per week.
+
+**Diet:**
+- Fill half your plate with vegetables and limit processed food.
+
+**Stress Management:**
+- Take five minutes of slow breathing twice a day.
+
+**Daily Habits:**
+1. Drink a glass of water after waking up.
+2. Walk for 30 minutes.
+3. Eat two servings of vegetables at lunch.
+4. Do five minutes of breathing exercises.
+5. Turn off screens an hour before bed."""
+
+STUB_HABITS = """Drink a glass of water after waking up
+Walk for 30 minutes
+Eat two servings of vegetables at lunch
+Do five minutes of breathing exercises
+Turn off screens an hour before bed"""
+
+STUB_SCORES = "Sleep: 70\nDiet: 65\nExercise: 55\nStress: 60"
+
+
+STUB_BUNDLE = {
+    "sections": {
+        "sleep": ["Keep a consistent bedtime and wake time."],
+        "exercise": ["Walk 30 minutes a day and add two strength sessions per week."],
+        "diet": ["Fill half your plate with vegetables and limit processed food."],
+        "stress_management": ["Take five minutes of slow breathing twice a day."],
+    },
+    "habits": STUB_HABITS.split("\n"),
+    "scores": {"Sleep": 70, "Diet": 65, "Exercise": 55, "Stress": 60},
+    "summary": "Small, consistent steps add up.",
+}
+
+
+def stub_reply(messages, response_format=None):
+    if response_format:
+        return json.dumps(STUB_BUNDLE)
+    system = (messages[0].get("content") or "").lower() if messages else ""
+    if "extract" in system:
+        return STUB_HABITS
+    if "score" in system:
+        return STUB_SCORES
+    return STUB_PLAN
+
+
+def completion_body(model, content):
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop",
+        }],
+        "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+    }
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    latency = 1.0
+    # Share of requests answered with error_status instead of a completion (e.g. 429 rate limits)
+    error_rate = 0.0
+    error_status = 429
+    request_count = 0
+    _count_lock = threading.Lock()
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, body, headers=None):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        with StubHandler._count_lock:
+            StubHandler.request_count += 1
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": "not found"}})
+            return
+        if self.error_rate and random.random() < self.error_rate:
+            headers = {"Retry-After": "0.2"} if self.error_status == 429 else None
+            self._send_json(self.error_status, {"error": {"message": "stub error", "type": "stub_error"}}, headers)
+            return
+        content = stub_reply(payload.get("messages", []), payload.get("response_format"))
+        if payload.get("stream"):
+            self._send_stream(payload.get("model", "stub"), content)
+            return
+        time.sleep(self.latency)
+        self._send_json(200, completion_body(payload.get("model", "stub"), content))
+
+    def _send_stream(self, model, content):
+        # Server-sent events, one line per chunk; the latency is spread across the chunks
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        lines = content.splitlines(keepends=True)
+        for line in lines:
+            time.sleep(self.latency / len(lines))
+            chunk = {
+                "id": "chatcmpl-stub",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": {"content": line}, "finish_reason": None}],
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            self.wfile.flush()
+        self.wfile.write(b"data: [DONE]\n\n")
+
+
+def start_server(port=0, latency=1.0, error_rate=0.0, error_status=429):
+    # Returns (server, base_url); the server runs on a daemon thread until server.shutdown()
+    handler = type("Handler", (StubHandler,), {"latency": latency, "error_rate": error_rate, "error_status": error_status})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1/"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stub OpenAI chat completions server")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=1.0, help="seconds to sleep per request")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests that fail with --error-status")
+    parser.add_argument("--error-status", type=int, default=429)
+    args = parser.parse_args()
+    handler = type("Handler", (StubHandler,), {
+        "latency": args.latency, "error_rate": args.error_rate, "error_status": args.error_status,
+    })
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), handler)
+    print(f"🤖 Stub OpenAI listening on http://127.0.0.1:{args.port}/v1 ({args.latency}s latency)")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,41 +1,57 @@
-import openai
+import json
+import os
 
-def get_ai_plan(prompt):
+from utils.ai_backends import get_backend
+from utils.ai_cache import cached_completion, invalidate_completion, stream_completion
+
+# The one place the app's prompts live; the page and every job call these functions.
+# The backend (OpenAI, stub, local model) is chosen in utils/ai_backends.py.
+CHAT_MODEL = os.environ.get("EVERAGE_AI_MODEL", "gpt-3.5-turbo")
+# Structured outputs (json_schema) need a model that supports them
+STRUCTURED_MODEL = os.environ.get("EVERAGE_AI_STRUCTURED_MODEL", "gpt-4o-mini")
+SCORE_KEYS = ["Sleep", "Diet", "Exercise", "Stress"]
+PLAN_SECTIONS = [("sleep", "Sleep"), ("exercise", "Exercise"), ("diet", "Diet"), ("stress_management", "Stress Management")]
+
+def plan_messages(prompt):
     structured_prompt = (
         f"{prompt}\n\n"
         "Please return a clearly formatted longevity plan with the following sections:\n"
         "- Sleep\n- Exercise\n- Diet\n- Stress Management\n"
         "Also include 5 specific, practical daily habits in a separate section titled 'Daily Habits'."
     )
-    response = openai.chat.completions.create(
-        model="gpt-3.5-turbo",
-        messages=[
-            {"role": "system", "content": "You are a longevity coach. Create personalized health plans with clear structure and formatting."},
-            {"role": "user", "content": structured_prompt}
-        ]
-    )
-    return response.choices[0].message.content.strip()
+    return [
+        {"role": "system", "content": "You are a longevity coach. Create personalized health plans with clear structure and formatting."},
+        {"role": "user", "content": structured_prompt}
+    ]
+
+def get_ai_plan(prompt, bypass_cache=False):
+    content = cached_completion(model=CHAT_MODEL, messages=plan_messages(prompt), bypass_cache=bypass_cache)
+    return content.strip()
+
+def stream_ai_plan(prompt, bypass_cache=False, stats=None):
+    # Same request (and cache entry) as get_ai_plan, delivered chunk by chunk
+    return stream_completion(model=CHAT_MODEL, messages=plan_messages(prompt), bypass_cache=bypass_cache, stats=stats)
 
 def extract_habits(plan_text):
-    response = openai.chat.completions.create(
-        model="gpt-3.5-turbo",
+    content = cached_completion(
+        model=CHAT_MODEL,
         messages=[
             {"role": "system", "content": "Extract exactly 5 clear, specific daily habits from this plan (no headers)."},
             {"role": "user", "content": plan_text}
         ]
     )
-    habits = [line.strip("•-• ").strip() for line in response.choices[0].message.content.strip().split("\n") if line.strip()]
+    habits = [line.strip("•-• ").strip() for line in content.strip().split("\n") if line.strip()]
     return habits[:5]
 
-def calculate_scores(prompt):
-    response = openai.chat.completions.create(
-        model="gpt-3.5-turbo",
+def calculate_scores(prompt, bypass_cache=False):
+    text = cached_completion(
+        model=CHAT_MODEL,
         messages=[
             {"role": "system", "content": "Score the user’s health habits (0-100) based on Sleep, Diet, Exercise, and Stress. Format each on a new line like: Sleep: 80"},
             {"role": "user", "content": prompt}
-        ]
+        ],
+        bypass_cache=bypass_cache
     )
-    text = response.choices[0].message.content
     scores = {"Sleep": 0, "Diet": 0, "Exercise": 0, "Stress": 0}
     for line in text.split("\n"):
         if ":" in line:
@@ -45,3 +61,88 @@ def calculate_scores(prompt):
             except ValueError:
                 continue
     return scores
+
+
+# ========== SINGLE-CALL STRUCTURED PLAN ==========
+_string_list = {"type": "array", "items": {"type": "string"}}
+PLAN_BUNDLE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "sections": {
+            "type": "object",
+            "properties": {key: _string_list for key, _ in PLAN_SECTIONS},
+            "required": [key for key, _ in PLAN_SECTIONS],
+            "additionalProperties": False
+        },
+        "habits": _string_list,
+        "scores": {
+            "type": "object",
+            "properties": {key: {"type": "integer"} for key in SCORE_KEYS},
+            "required": SCORE_KEYS,
+            "additionalProperties": False
+        },
+        "summary": {"type": "string"}
+    },
+    "required": ["sections", "habits", "scores", "summary"],
+    "additionalProperties": False
+}
+
+
+def parse_plan_bundle(content):
+    # Validates the structured response; raises ValueError if anything is missing or out of range
+    try:
+        data = json.loads(content)
+        sections = {key: [str(item).strip() for item in data["sections"][key] if str(item).strip()] for key, _ in PLAN_SECTIONS}
+        habits = [str(h).strip() for h in data["habits"] if str(h).strip()]
+        scores = {key: int(data["scores"][key]) for key in SCORE_KEYS}
+        summary = str(data.get("summary", "")).strip()
+    except (TypeError, KeyError, AttributeError, json.JSONDecodeError) as e:
+        raise ValueError(f"Malformed plan response: {e}") from e
+    if not all(sections.values()):
+        raise ValueError("Plan response has an empty section")
+    if len(habits) < 5:
+        raise ValueError(f"Plan response has {len(habits)} habits, expected 5")
+    if not all(0 <= v <= 100 for v in scores.values()):
+        raise ValueError("Plan response has a score outside 0-100")
+    return {"sections": sections, "habits": habits[:5], "scores": scores, "summary": summary}
+
+
+def format_plan(bundle):
+    # Renders the structured plan as the same markdown layout the three-call path produces
+    parts = []
+    for key, title in PLAN_SECTIONS:
+        parts.append(f"**{title}:**\n" + "\n".join(f"- {item}" for item in bundle["sections"][key]))
+    parts.append("**Daily Habits:**\n" + "\n".join(f"{i}. {h}" for i, h in enumerate(bundle["habits"], 1)))
+    if bundle["summary"]:
+        parts.append(bundle["summary"])
+    return "\n\n".join(parts)
+
+
+def get_structured_plan(prompt, bypass_cache=False):
+    # One round-trip for plan, habits and scores; returns (plan_text, habits, scores)
+    if not get_backend().supports_structured:
+        raise ValueError(f"The {get_backend().name} AI backend has no structured output mode")
+    messages = [
+        {"role": "system", "content": (
+            "You are a longevity coach. Create a personalized health plan with Sleep, Exercise, Diet and "
+            "Stress Management sections, exactly 5 specific, practical daily habits, and score the user's "
+            "current Sleep, Diet, Exercise and Stress habits from 0 to 100."
+        )},
+        {"role": "user", "content": prompt}
+    ]
+    response_format = {
+        "type": "json_schema",
+        "json_schema": {"name": "longevity_plan", "schema": PLAN_BUNDLE_SCHEMA, "strict": True}
+    }
+    content = cached_completion(
+        model=STRUCTURED_MODEL,
+        messages=messages,
+        bypass_cache=bypass_cache,
+        response_format=response_format
+    )
+    try:
+        bundle = parse_plan_bundle(content)
+    except ValueError:
+        invalidate_completion(STRUCTURED_MODEL, messages, response_format=response_format)
+        raise
+    return format_plan(bundle), bundle["habits"], bundle["scores"]
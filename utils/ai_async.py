@@ -0,0 +1,83 @@
+import asyncio
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from utils.ai import calculate_scores, extract_habits, get_ai_plan, get_structured_plan
+
+# Wall-clock budget for each individual model call
+AI_CALL_TIMEOUT_SECONDS = float(os.environ.get("EVERAGE_AI_CALL_TIMEOUT", 90))
+# Set EVERAGE_AI_STRUCTURED=0 to always use the three-call path
+STRUCTURED_MODE = os.environ.get("EVERAGE_AI_STRUCTURED", "1") != "0"
+
+# Process-wide pool shared by all sessions. Unlike asyncio.to_thread's per-loop default executor,
+# asyncio.run() doesn't wait on it at shutdown, so a timed-out call returns to the user immediately.
+_executor = ThreadPoolExecutor(max_workers=int(os.environ.get("EVERAGE_AI_WORKERS", 16)), thread_name_prefix="everage-ai")
+
+
+async def _call(fn, *args, timeout, **kwargs):
+    # The blocking client runs in a worker thread; wait_for gives us a per-call timeout and
+    # cancellation point, and the client's own request timeout releases the thread afterwards
+    try:
+        loop = asyncio.get_running_loop()
+        return await asyncio.wait_for(loop.run_in_executor(_executor, functools.partial(fn, *args, **kwargs)), timeout)
+    except asyncio.TimeoutError:
+        raise TimeoutError(f"{fn.__name__} did not finish within {timeout:g}s") from None
+
+
+async def generate_plan_bundle_async(prompt, plan_fn=get_ai_plan, habits_fn=extract_habits,
+                                     scores_fn=calculate_scores, bypass_cache=False,
+                                     timeout=AI_CALL_TIMEOUT_SECONDS):
+    # Scores depend only on the prompt, so they run alongside plan -> habits:
+    # wall time is max(plan + habits, scores) instead of the sum of all three
+    scores_task = asyncio.create_task(_call(scores_fn, prompt, bypass_cache=bypass_cache, timeout=timeout))
+    try:
+        plan = await _call(plan_fn, prompt, bypass_cache=bypass_cache, timeout=timeout)
+        habits = await _call(habits_fn, plan, timeout=timeout)
+        scores = await scores_task
+    except BaseException:
+        scores_task.cancel()
+        raise
+    return plan, habits, scores
+
+
+def generate_plan_bundle(prompt, plan_fn=get_ai_plan, habits_fn=extract_habits,
+                         scores_fn=calculate_scores, bypass_cache=False,
+                         timeout=AI_CALL_TIMEOUT_SECONDS):
+    # Sync entry point for the Streamlit script thread, which has no running event loop
+    return asyncio.run(generate_plan_bundle_async(
+        prompt, plan_fn, habits_fn, scores_fn, bypass_cache=bypass_cache, timeout=timeout
+    ))
+
+
+def generate_plan(prompt, plan_fn=get_ai_plan, habits_fn=extract_habits, scores_fn=calculate_scores,
+                  bypass_cache=False, timeout=AI_CALL_TIMEOUT_SECONDS, structured=STRUCTURED_MODE):
+    # Preferred path: one structured round-trip. If the response fails validation (or the model
+    # rejects the schema), fall back to the concurrent three-call pipeline. Anything else (a
+    # timeout, rate limits or 5xx that outlasted the retries, auth/connection errors) is raised:
+    # three more calls would only add traffic and make the user wait longer.
+    if structured:
+        try:
+            return asyncio.run(_call(get_structured_plan, prompt, bypass_cache=bypass_cache, timeout=timeout))
+        except ValueError:
+            pass
+        except Exception as e:
+            import openai
+
+            if not isinstance(e, openai.BadRequestError):
+                raise
+    return generate_plan_bundle(prompt, plan_fn, habits_fn, scores_fn, bypass_cache=bypass_cache, timeout=timeout)
+
+
+def submit(fn, *args, **kwargs):
+    # Starts a call on the shared AI pool, e.g. scores while the plan streams into the page
+    return _executor.submit(fn, *args, **kwargs)
+
+
+def wait_result(future, timeout=AI_CALL_TIMEOUT_SECONDS):
+    try:
+        return future.result(timeout=timeout)
+    except FutureTimeoutError:
+        future.cancel()
+        raise TimeoutError(f"AI call did not finish within {timeout:g}s") from None
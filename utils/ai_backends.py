@@ -0,0 +1,283 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import deque
+
+from utils.tracing import span
+
+# Where completions come from. Every AI call in the app goes through get_backend(), so the
+# same code path runs against OpenAI, an offline deterministic stub (load tests, demos) or an
+# optional local model. Pick one with EVERAGE_AI_BACKEND=openai|stub|local.
+#
+# Each backend keeps its own latency / token / cost accounting, see backend_stats().
+
+AI_BACKEND = os.environ.get("EVERAGE_AI_BACKEND", "openai")
+# Simulated per-call latency of the stub backend, for load tests
+STUB_LATENCY_SECONDS = float(os.environ.get("EVERAGE_AI_STUB_LATENCY", 0))
+# Hugging Face model for the local backend (needs `pip install transformers torch`)
+LOCAL_MODEL = os.environ.get("EVERAGE_AI_LOCAL_MODEL", "Qwen/Qwen2.5-0.5B-Instruct")
+LOCAL_MAX_NEW_TOKENS = int(os.environ.get("EVERAGE_AI_LOCAL_MAX_TOKENS", 600))
+
+# USD per 1M tokens (input, output); models not listed are counted as free
+MODEL_PRICES = {
+    "gpt-3.5-turbo": (0.50, 1.50),
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+}
+
+
+def estimate_cost(model, prompt_tokens, completion_tokens):
+    price_in, price_out = MODEL_PRICES.get(model, (0.0, 0.0))
+    return (prompt_tokens * price_in + completion_tokens * price_out) / 1_000_000
+
+
+def _count_tokens(text):
+    # ~4 characters per token, for backends that don't report usage
+    return len(text) // 4
+
+
+# ========== ACCOUNTING ==========
+class BackendStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=1000)
+        self.calls = 0
+        self.errors = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cost = 0.0
+
+    def record(self, latency, prompt_tokens=0, completion_tokens=0, cost=0.0, error=False):
+        with self._lock:
+            self.calls += 1
+            self.errors += error
+            self._latencies.append(latency)
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+            self.cost += cost
+
+    def snapshot(self):
+        with self._lock:
+            latencies = sorted(self._latencies)
+            pick = lambda q: latencies[min(len(latencies) - 1, int(len(latencies) * q))] if latencies else None
+            return {
+                "calls": self.calls,
+                "errors": self.errors,
+                "latency_p50": pick(0.5),
+                "latency_p95": pick(0.95),
+                "prompt_tokens": self.prompt_tokens,
+                "completion_tokens": self.completion_tokens,
+                "cost_usd": round(self.cost, 6),
+            }
+
+
+# ========== BACKENDS ==========
+class Backend:
+    """A source of chat completions: complete() returns the text, stream() yields it in chunks."""
+
+    name = "base"
+    supports_structured = False
+
+    def __init__(self):
+        self.stats = BackendStats()
+
+    def model_id(self, model):
+        # The model that actually answers a request for `model`; part of the response cache key
+        return model
+
+    def complete(self, model, messages, timeout=None, **params):
+        start = time.perf_counter()
+        try:
+            with span("ai.complete"):
+                content, prompt_tokens, completion_tokens = self._complete(model, messages, timeout=timeout, **params)
+        except Exception:
+            self.stats.record(time.perf_counter() - start, error=True)
+            raise
+        self.stats.record(
+            time.perf_counter() - start, prompt_tokens, completion_tokens,
+            estimate_cost(self.model_id(model), prompt_tokens, completion_tokens),
+        )
+        return content
+
+    def stream(self, model, messages, timeout=None):
+        start = time.perf_counter()
+        usage = {}
+        chunks = []
+        try:
+            for text in self._stream(model, messages, timeout=timeout, usage=usage):
+                chunks.append(text)
+                yield text
+        except Exception:
+            self.stats.record(time.perf_counter() - start, error=True)
+            raise
+        prompt_tokens = usage.get("prompt_tokens", _count_tokens(json.dumps(messages)))
+        completion_tokens = usage.get("completion_tokens", _count_tokens("".join(chunks)))
+        self.stats.record(
+            time.perf_counter() - start, prompt_tokens, completion_tokens,
+            estimate_cost(self.model_id(model), prompt_tokens, completion_tokens),
+        )
+
+    def _complete(self, model, messages, timeout=None, **params):
+        # Returns (content, prompt_tokens, completion_tokens)
+        raise NotImplementedError
+
+    def _stream(self, model, messages, timeout=None, usage=None):
+        # Default: no incremental output, the whole answer arrives as one chunk
+        content, prompt_tokens, completion_tokens = self._complete(model, messages, timeout=timeout)
+        if usage is not None:
+            usage.update(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+        yield content
+
+
+class OpenAIBackend(Backend):
+    name = "openai"
+    supports_structured = True
+
+    def _complete(self, model, messages, timeout=None, **params):
+        from utils.ratelimit import limited_create
+
+        response = limited_create(model=model, messages=messages, timeout=timeout, **params)
+        usage = response.usage
+        return (
+            response.choices[0].message.content,
+            usage.prompt_tokens if usage else 0,
+            usage.completion_tokens if usage else 0,
+        )
+
+    def _stream(self, model, messages, timeout=None, usage=None):
+        from utils.ratelimit import limited_create
+
+        stream = limited_create(
+            model=model, messages=messages, stream=True, timeout=timeout,
+            stream_options={"include_usage": True},
+        )
+        for chunk in stream:
+            if getattr(chunk, "usage", None) is not None and usage is not None:
+                usage.update(prompt_tokens=chunk.usage.prompt_tokens, completion_tokens=chunk.usage.completion_tokens)
+            if not chunk.choices:
+                continue
+            text = chunk.choices[0].delta.content
+            if text:
+                yield text
+
+
+class StubBackend(Backend):
+    """Offline, deterministic answers shaped like the real ones; the same request always gets the same reply."""
+
+    name = "stub"
+    supports_structured = True
+
+    def __init__(self, latency=STUB_LATENCY_SECONDS):
+        super().__init__()
+        self.latency = latency
+
+    def model_id(self, model):
+        return f"stub:{model}"
+
+    def reply(self, messages, response_format=None):
+        from utils.ai import PLAN_SECTIONS, SCORE_KEYS
+
+        user = (messages[-1].get("content") or "") if messages else ""
+        seed = hashlib.sha256(user.encode("utf-8")).digest()
+        scores = {key: 40 + seed[i] % 50 for i, key in enumerate(SCORE_KEYS)}
+        habits = [
+            "Drink a glass of water after waking up",
+            "Walk for 30 minutes",
+            "Eat two servings of vegetables at lunch",
+            "Do five minutes of breathing exercises",
+            "Turn off screens an hour before bed",
+        ]
+        sections = {
+            "sleep": ["Keep a consistent bedtime and wake time."],
+            "exercise": ["Walk 30 minutes a day and add two strength sessions per week."],
+            "diet": ["Fill half your plate with vegetables and limit processed food."],
+            "stress_management": ["Take five minutes of slow breathing twice a day."],
+        }
+        if response_format:
+            return json.dumps({"sections": sections, "habits": habits, "scores": scores,
+                               "summary": "Small, consistent steps add up."})
+        system = (messages[0].get("content") or "").lower() if messages else ""
+        if "extract" in system:
+            return "\n".join(habits)
+        if "score" in system:
+            return "\n".join(f"{key}: {value}" for key, value in scores.items())
+        parts = [f"**{title}:**\n" + "\n".join(f"- {item}" for item in sections[key]) for key, title in PLAN_SECTIONS]
+        parts.append("**Daily Habits:**\n" + "\n".join(f"{i}. {h}." for i, h in enumerate(habits, 1)))
+        return "\n\n".join(parts)
+
+    def _complete(self, model, messages, timeout=None, **params):
+        time.sleep(self.latency)
+        content = self.reply(messages, params.get("response_format"))
+        return content, _count_tokens(json.dumps(messages)), _count_tokens(content)
+
+    def _stream(self, model, messages, timeout=None, usage=None):
+        lines = self.reply(messages).splitlines(keepends=True)
+        for line in lines:
+            time.sleep(self.latency / len(lines))
+            yield line
+
+
+class LocalModelBackend(Backend):
+    """A small instruction-tuned model run in-process with transformers (optional dependency)."""
+
+    name = "local"
+
+    def __init__(self, model_name=LOCAL_MODEL, max_new_tokens=LOCAL_MAX_NEW_TOKENS):
+        super().__init__()
+        self.model_name = model_name
+        self.max_new_tokens = max_new_tokens
+        self._pipeline = None
+        self._lock = threading.Lock()
+
+    def model_id(self, model):
+        return f"local:{self.model_name}"
+
+    def _load(self):
+        # Loaded on first use; a single pipeline is shared (and serialised) across sessions
+        if self._pipeline is None:
+            try:
+                from transformers import pipeline
+            except ImportError as e:
+                raise RuntimeError("The local AI backend needs `pip install transformers torch`") from e
+            self._pipeline = pipeline("text-generation", model=self.model_name)
+        return self._pipeline
+
+    def _complete(self, model, messages, timeout=None, **params):
+        with self._lock:
+            generator = self._load()
+            output = generator(messages, max_new_tokens=self.max_new_tokens, do_sample=False)
+        content = output[0]["generated_text"][-1]["content"]
+        return content, _count_tokens(json.dumps(messages)), _count_tokens(content)
+
+
+BACKENDS = {"openai": OpenAIBackend, "stub": StubBackend, "local": LocalModelBackend}
+
+_backends = {}
+_active = AI_BACKEND
+_backends_lock = threading.Lock()
+
+
+def get_backend(name=None):
+    # One instance per backend per process, so accounting covers every session
+    name = name or _active
+    with _backends_lock:
+        if name not in _backends:
+            if name not in BACKENDS:
+                raise ValueError(f"Unknown AI backend {name!r}; choose one of {', '.join(BACKENDS)}")
+            _backends[name] = BACKENDS[name]()
+        return _backends[name]
+
+
+def set_backend(name):
+    # Switches the process to another backend (benchmarks, warm-up jobs)
+    global _active
+    get_backend(name)
+    _active = name
+
+
+def backend_stats():
+    with _backends_lock:
+        backends = dict(_backends)
+    return {name: backend.stats.snapshot() for name, backend in backends.items()}
@@ -0,0 +1,162 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+from utils import tracing
+from utils.ai_backends import get_backend
+from utils.db import ProcessSingleton, ThreadLocalConnection
+
+CACHE_FILE = os.path.join("data", "ai_cache.db")
+CACHE_TTL_SECONDS = int(os.environ.get("EVERAGE_AI_CACHE_TTL", 7 * 24 * 3600))
+CACHE_MAX_ENTRIES = int(os.environ.get("EVERAGE_AI_CACHE_MAX_ENTRIES", 5000))
+# Upper bound on a single HTTP round-trip, so abandoned calls don't hold a worker thread forever
+REQUEST_TIMEOUT_SECONDS = float(os.environ.get("EVERAGE_AI_REQUEST_TIMEOUT", 60))
+
+def cache_key(model, messages, **params):
+    # Content address of a request: same model + messages + params -> same answer
+    payload = json.dumps({"model": model, "messages": messages, **params}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+# ========== RESPONSE CACHE ==========
+class ResponseCache:
+    """Persistent (SQLite) completion cache with TTL expiry and LRU eviction, shared by every session."""
+
+    def __init__(self, path=CACHE_FILE, ttl=CACHE_TTL_SECONDS, max_entries=CACHE_MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.bypasses = 0
+        self._lock = threading.Lock()
+        self._conn = ThreadLocalConnection(path)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY,"
+                " model TEXT NOT NULL,"
+                " content TEXT NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " last_used REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+
+    def _count(self, name):
+        # Also reported as ai_cache.<name> in the tracing counters (admin panel, Prometheus)
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+        tracing.count(f"ai_cache.{name}")
+
+    def get(self, key):
+        now = time.time()
+        conn = self._conn()
+        row = conn.execute("SELECT content, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None or (self.ttl and now - row[1] > self.ttl):
+            self._count("misses")
+            return None
+        with conn:
+            conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+        self._count("hits")
+        return row[0]
+
+    def set(self, key, model, content):
+        now = time.time()
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, model, content, created_at, last_used) VALUES (?, ?, ?, ?, ?)",
+                (key, model, content, now, now),
+            )
+            if self.ttl:
+                conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl,))
+            # Evict least recently used rows beyond the size cap
+            conn.execute(
+                "DELETE FROM responses WHERE key IN ("
+                " SELECT key FROM responses ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def delete(self, key):
+        conn = self._conn()
+        with conn:
+            conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+
+    def stats(self):
+        size = self._conn().execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "bypasses": self.bypasses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": size,
+        }
+
+
+_cache = ProcessSingleton(ResponseCache)
+
+
+def get_cache():
+    return _cache.get()
+
+
+# ========== CACHED COMPLETION ==========
+def cached_completion(model, messages, bypass_cache=False, **params):
+    # bypass_cache skips the lookup but still stores the fresh answer, so "Regenerate" refreshes the entry.
+    # Extra params (e.g. response_format) are sent to the API and are part of the cache key.
+    # Answers are cached per backend model (see utils/ai_backends.py), so stub replies never mix with real ones
+    cache = get_cache()
+    backend = get_backend()
+    key = cache_key(backend.model_id(model), messages, **params)
+    if bypass_cache:
+        cache._count("bypasses")
+    else:
+        content = cache.get(key)
+        if content is not None:
+            return content
+    content = backend.complete(model, messages, timeout=REQUEST_TIMEOUT_SECONDS, **params)
+    cache.set(key, backend.model_id(model), content)
+    return content
+
+
+def invalidate_completion(model, messages, **params):
+    # Drops a cached answer that turned out to be unusable, so the next call asks again
+    get_cache().delete(cache_key(get_backend().model_id(model), messages, **params))
+
+
+# ========== STREAMING COMPLETION ==========
+def stream_completion(model, messages, bypass_cache=False, stats=None):
+    # Yields text chunks as they arrive. A cache hit yields the stored answer in one chunk; a miss
+    # stores the full text once the stream closes. Shares cache keys with cached_completion().
+    # If a stats dict is given, "ttft" (seconds to first chunk) is written into it.
+    cache = get_cache()
+    backend = get_backend()
+    key = cache_key(backend.model_id(model), messages)
+    start = time.perf_counter()
+    if bypass_cache:
+        cache._count("bypasses")
+    else:
+        content = cache.get(key)
+        if content is not None:
+            if stats is not None:
+                stats["ttft"] = time.perf_counter() - start
+                stats["cached"] = True
+            yield content
+            return
+    chunks = []
+    for text in backend.stream(model, messages, timeout=REQUEST_TIMEOUT_SECONDS):
+        if not chunks:
+            ttft = time.perf_counter() - start
+            tracing.observe("ai.ttft", ttft)
+            if stats is not None:
+                stats["ttft"] = ttft
+                stats["cached"] = False
+        chunks.append(text)
+        yield text
+    cache.set(key, backend.model_id(model), "".join(chunks))
+
@@ -0,0 +1,122 @@
+import io
+import json
+import logging
+import os
+import threading
+
+# Landing/main page assets, loaded once per process instead of on every rerun. Entries are keyed
+# by path and re-read only when the file's mtime changes, so swapping a logo or editing
+# testimonials.json shows up without a restart.
+#
+# Images are pre-resized to what the page actually displays (2x for high-DPI screens) before
+# st.image sees them. The demo animation is not sent through st.image at all: it's served from
+# ./static (server.enableStaticServing) as an animated WebP, converted from demo.gif in the
+# background the first time it's needed (or ahead of time with tools/build_assets.py), and
+# embedded with loading="lazy" so the browser fetches it only when it scrolls into view.
+
+STATIC_DIR = "static"
+TESTIMONIALS_FILE = os.path.join("data", "testimonials.json")
+DEMO_GIF = os.path.join(STATIC_DIR, "demo.gif")
+DEMO_WEBP = os.path.join(STATIC_DIR, "demo.webp")
+# URL prefix Streamlit serves ./static under
+STATIC_URL = "app/static/"
+DISPLAY_SCALE = 2
+WEBP_QUALITY = 70
+
+logger = logging.getLogger(__name__)
+_lock = threading.Lock()
+_cache = {}  # (kind, path, *args) -> (mtime, value)
+_converting = set()
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def _cached(key, path, load):
+    mtime = _mtime(path)
+    with _lock:
+        entry = _cache.get(key)
+    if entry is not None and entry[0] == mtime:
+        return entry[1]
+    value = load(path) if mtime is not None else None
+    with _lock:
+        _cache[key] = (mtime, value)
+    return value
+
+
+def _load_image(path, width):
+    from PIL import Image
+
+    with Image.open(path) as im:
+        im.load()
+        target = width * DISPLAY_SCALE
+        if im.width > target:
+            im = im.resize((target, round(im.height * target / im.width)), Image.LANCZOS)
+        buf = io.BytesIO()
+        im.save(buf, format="PNG", optimize=True)
+    return buf.getvalue()
+
+
+def image(path, width):
+    # PNG bytes for st.image(..., width=width), or None if the file is missing
+    return _cached(("image", path, width), path, lambda p: _load_image(p, width))
+
+
+def _load_json(path):
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def testimonials(path=TESTIMONIALS_FILE):
+    # None if the file is missing
+    return _cached(("json", path), path, _load_json)
+
+
+# ========== DEMO ANIMATION ==========
+def build_demo_webp(src=DEMO_GIF, dst=DEMO_WEBP):
+    # Several seconds for a long GIF; written to a temp file so the page never serves half of it
+    from PIL import Image
+
+    tmp_path = dst + ".tmp"
+    with Image.open(src) as im:
+        im.save(tmp_path, format="WEBP", save_all=True, quality=WEBP_QUALITY, method=4, loop=0)
+    os.replace(tmp_path, dst)
+
+
+def _convert_in_background(src, dst):
+    with _lock:
+        if dst in _converting:
+            return
+        _converting.add(dst)
+
+    def run():
+        try:
+            build_demo_webp(src, dst)
+        except Exception:
+            logger.exception("Demo WebP conversion failed")
+        finally:
+            with _lock:
+                _converting.discard(dst)
+
+    threading.Thread(target=run, name="everage-assets", daemon=True).start()
+
+
+def demo_url(src=DEMO_GIF, dst=DEMO_WEBP):
+    # Static URL of the demo animation: the WebP once it's up to date, the GIF until then.
+    # None if there is no demo at all.
+    src_mtime = _mtime(src)
+    if src_mtime is None:
+        return None
+    dst_mtime = _mtime(dst)
+    if dst_mtime is not None and dst_mtime >= src_mtime:
+        return STATIC_URL + os.path.relpath(dst, STATIC_DIR)
+    _convert_in_background(src, dst)
+    return STATIC_URL + os.path.relpath(src, STATIC_DIR)
+
+
+def demo_html(url, alt="EverAge demo"):
+    return f'<img src="{url}" alt="{alt}" loading="lazy" decoding="async" style="width: 100%; border-radius: 8px;">'
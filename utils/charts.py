@@ -1,14 +1,57 @@
-import matplotlib.pyplot as plt
+import io
+
 import streamlit as st
 
-def show_progress_chart(data):
-    if not data:
+from utils.tracing import span
+
+# Above this many days the chart shows one bar per week, so render cost stops growing with history
+MAX_DAILY_BARS = 60
+
+
+def progress_series(matrix):
+    # (labels, values, y_label) for the progress chart, aggregated per week for long histories
+    if len(matrix.dates) <= MAX_DAILY_BARS:
+        return [str(d) for d in matrix.dates], [int(v) for v in matrix.daily_completed()], "Habits Completed"
+    weekly = matrix.completed_series().resample("W").mean()
+    return [d.strftime("%Y-%m-%d") for d in weekly.index], [round(float(v), 2) for v in weekly], "Avg Habits / Day (weekly)"
+
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def render_progress_png(digest, _labels, _values, y_label, y_max):
+    # Memoised on the check-in digest; the underscore arguments are not hashed
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    with span("chart.render"):
+        fig, ax = plt.subplots(figsize=(8, 4))
+        try:
+            ax.bar(_labels, _values, color="#0A7E8C")
+            ax.set_title("Weekly Habit Progress")
+            ax.set_ylabel(y_label)
+            ax.set_ylim(0, y_max)
+            ax.tick_params(axis="x", rotation=45)
+            if len(_labels) > 20:
+                step = len(_labels) // 20 + 1
+                ax.set_xticks(range(0, len(_labels), step))
+                ax.set_xticklabels(_labels[::step])
+            fig.tight_layout()
+            buf = io.BytesIO()
+            fig.savefig(buf, format="png", dpi=100)
+            return buf.getvalue()
+        finally:
+            plt.close(fig)
+
+
+def show_progress_chart(matrix, native=False):
+    if not len(matrix.dates):
         st.info("No check-in data yet.")
         return
-    labels = [d["date"] for d in data]
-    values = [sum(d["checked"]) for d in data]
-    plt.figure(figsize=(8, 4))
-    plt.bar(labels, values, color='green')
-    plt.ylabel("Habits Completed")
-    plt.title("Weekly Habit Progress")
-    st.pyplot(plt)
+    labels, values, y_label = progress_series(matrix)
+    if native:
+        import pandas as pd
+        st.bar_chart(pd.Series(values, index=labels, name=y_label))
+        return
+    with span("chart"):
+        png = render_progress_png(matrix.digest(), labels, values, y_label, max(matrix.n_habits, 1))
+        st.image(png)
@@ -0,0 +1,215 @@
+import hashlib
+import io
+
+import numpy as np
+
+from utils.habits import checkin_ids
+
+# Check-ins as a compact date x habit boolean matrix: one row per day (multiple check-ins on the
+# same day are OR-ed, like the streak engine), one column per habit ID (utils/habits.py) across
+# every plan the user had, plus the first day each habit appeared in a check-in. Persisted per
+# user as a bit-packed .npz blob, so the Progress tab never re-walks the JSON check-in list.
+# select() gives the columns of one habit set (normally the current plan) for the analytics.
+
+BLOB_NAME = "checkins.npz"
+_NO_DAY = np.datetime64("NaT", "D")
+
+
+class CheckinMatrix:
+    def __init__(self, dates, done, n_checkins=0, habit_ids=(), first_seen=None):
+        self.dates = np.asarray(dates, dtype="datetime64[D]")
+        self.done = np.asarray(done, dtype=bool)
+        # Number of JSON check-ins folded in; lets callers detect a stale matrix cheaply
+        self.n_checkins = n_checkins
+        self.habit_ids = list(habit_ids)
+        self.first_seen = (np.asarray(first_seen, dtype="datetime64[D]") if first_seen is not None
+                           else np.full(len(self.habit_ids), _NO_DAY))
+        self._columns = {hid: i for i, hid in enumerate(self.habit_ids)}
+
+    @property
+    def n_habits(self):
+        return self.done.shape[1]
+
+    @classmethod
+    def from_checkins(cls, checkins, habit_sets):
+        habit_ids = list(dict.fromkeys(hid for ids in habit_sets for hid in ids))
+        columns = {hid: i for i, hid in enumerate(habit_ids)}
+        if not checkins:
+            return cls(np.array([], dtype="datetime64[D]"), np.zeros((0, len(habit_ids)), dtype=bool), habit_ids=habit_ids)
+        day = np.array([c["date"] for c in checkins], dtype="datetime64[D]")
+        flags = np.zeros((len(checkins), len(habit_ids)), dtype=bool)
+        seen = np.zeros((len(checkins), len(habit_ids)), dtype=bool)
+        for row, c in enumerate(checkins):
+            for hid, done in zip(checkin_ids(habit_sets, c), c["checked"]):
+                flags[row, columns[hid]] = done
+                seen[row, columns[hid]] = True
+        dates, inverse = np.unique(day, return_inverse=True)
+        done = np.zeros((len(dates), len(habit_ids)), dtype=bool)
+        np.logical_or.at(done, inverse, flags)
+        first_seen = np.where(seen.any(axis=0), np.where(seen, day[:, None], np.datetime64("9999-12-31")).min(axis=0), _NO_DAY)
+        return cls(dates, done, n_checkins=len(checkins), habit_ids=habit_ids, first_seen=first_seen)
+
+    def _column(self, hid):
+        # Column of a habit ID, added (all not-done) if the matrix hasn't seen it yet
+        i = self._columns.get(hid)
+        if i is None:
+            i = len(self.habit_ids)
+            self.habit_ids.append(hid)
+            self._columns[hid] = i
+            self.done = np.hstack([self.done, np.zeros((len(self.dates), 1), dtype=bool)])
+            self.first_seen = np.append(self.first_seen, _NO_DAY)
+        return i
+
+    def append(self, checkin, habit_sets):
+        day = np.datetime64(checkin["date"], "D")
+        cols = [self._column(hid) for hid in checkin_ids(habit_sets, checkin)]
+        row = np.zeros(self.n_habits, dtype=bool)
+        for col, done in zip(cols, checkin["checked"]):
+            row[col] = done
+            if np.isnat(self.first_seen[col]) or day < self.first_seen[col]:
+                self.first_seen[col] = day
+        i = int(np.searchsorted(self.dates, day))
+        if i < len(self.dates) and self.dates[i] == day:
+            self.done[i] |= row
+        else:
+            self.dates = np.insert(self.dates, i, day)
+            self.done = np.insert(self.done, i, row, axis=0)
+        self.n_checkins += 1
+        return self
+
+    def select(self, habit_ids):
+        # The same days restricted to (and ordered like) habit_ids; unknown IDs are empty columns
+        cols = [self._columns.get(hid) for hid in habit_ids]
+        done = np.zeros((len(self.dates), len(habit_ids)), dtype=bool)
+        first_seen = np.full(len(habit_ids), _NO_DAY)
+        for j, col in enumerate(cols):
+            if col is not None:
+                done[:, j] = self.done[:, col]
+                first_seen[j] = self.first_seen[col]
+        return CheckinMatrix(self.dates, done, n_checkins=self.n_checkins, habit_ids=habit_ids, first_seen=first_seen)
+
+    # ========== SERIALISATION ==========
+    def to_bytes(self):
+        buf = io.BytesIO()
+        np.savez_compressed(
+            buf,
+            days=self.dates.astype(np.int64),
+            bits=np.packbits(self.done, axis=1),
+            shape=np.array(self.done.shape, dtype=np.int64),
+            n_checkins=np.array(self.n_checkins, dtype=np.int64),
+            habit_ids=np.array(self.habit_ids, dtype=str),
+            first_seen=self.first_seen.astype(np.int64),
+        )
+        return buf.getvalue()
+
+    @classmethod
+    def from_bytes(cls, data):
+        # None for blobs written before habit IDs (columns by position), so they get rebuilt
+        with np.load(io.BytesIO(data)) as f:
+            if "habit_ids" not in f:
+                return None
+            n_days, n_habits = (int(x) for x in f["shape"])
+            done = np.unpackbits(f["bits"], axis=1, count=n_habits).astype(bool) if n_days else np.zeros((0, n_habits), dtype=bool)
+            return cls(f["days"].astype("datetime64[D]"), done, n_checkins=int(f["n_checkins"]),
+                       habit_ids=[str(hid) for hid in f["habit_ids"]], first_seen=f["first_seen"].astype("datetime64[D]"))
+
+    # ========== ANALYTICS ==========
+    def daily_completed(self):
+        return self.done.sum(axis=1)
+
+    def _daily_frame(self):
+        # Every calendar day from first to last check-in; days without a check-in count as not done
+        import pandas as pd
+        frame = pd.DataFrame(self.done, index=pd.DatetimeIndex(self.dates))
+        return frame.asfreq("D", fill_value=False).astype(bool)
+
+    def _started(self, frame):
+        # days x habits: True from the day each habit first appeared in a check-in
+        days = frame.index.values.astype("datetime64[D]")
+        return days[:, None] >= self.first_seen[None, :]
+
+    def completion_rates(self, freq="W"):
+        # Share of habit-days completed per period: freq "W" (weeks ending Sunday) or "MS" (months).
+        # A habit counts only from its first check-in, so a new plan doesn't drag down earlier periods.
+        import pandas as pd
+        if not len(self.dates):
+            return pd.Series(dtype=float)
+        frame = self._daily_frame()
+        return frame.astype(float).where(self._started(frame)).resample(freq).mean().mean(axis=1).fillna(0.0)
+
+    def weekly_completion_rates(self):
+        return self.completion_rates("W")
+
+    def monthly_completion_rates(self):
+        return self.completion_rates("MS")
+
+    def habit_adherence(self):
+        # Per-habit share of days completed since the habit's first check-in
+        if not len(self.dates):
+            return np.zeros(self.n_habits)
+        frame = self._daily_frame()
+        started = self._started(frame)
+        days = started.sum(axis=0)
+        return np.where(days > 0, (frame.to_numpy() & started).sum(axis=0) / np.maximum(days, 1), 0.0)
+
+    def completed_series(self):
+        # Habits completed per calendar day (0 on days without a check-in)
+        import pandas as pd
+        if not len(self.dates):
+            return pd.Series(dtype=float)
+        return self._daily_frame().sum(axis=1)
+
+    def rolling_completed(self, window=7):
+        # Rolling mean of habits completed per day
+        return self.completed_series().rolling(window, min_periods=1).mean()
+
+    def digest(self):
+        # Content hash of the matrix, used as a cache key for rendered charts
+        h = hashlib.sha1(self.dates.astype(np.int64).tobytes())
+        h.update(np.packbits(self.done, axis=1).tobytes())
+        h.update(str(self.done.shape).encode())
+        return h.hexdigest()
+
+    def run_lengths(self):
+        # Length of the done-run ending on each calendar day, per habit (vectorised cumsum trick)
+        if not len(self.dates):
+            return np.zeros((0, self.n_habits), dtype=np.int64)
+        span = (self.dates[-1] - self.dates[0]).astype(int) + 1
+        daily = np.zeros((span, self.n_habits), dtype=bool)
+        daily[(self.dates - self.dates[0]).astype(int)] = self.done
+        count = np.cumsum(daily, axis=0)
+        reset = np.maximum.accumulate(np.where(daily, 0, count), axis=0)
+        return count - reset
+
+
+def streaks_from_matrix(matrix, habit_ids):
+    # Same state shape as utils.streaks.rebuild_streaks (keyed by habit ID), computed from the matrix
+    runs = matrix.select(habit_ids).run_lengths()
+    streaks = {}
+    for i, hid in enumerate(habit_ids):
+        if not len(runs):
+            streaks[hid] = {"current": 0, "best": 0, "last_date": None, "before": 0}
+            continue
+        column = runs[:, i]
+        streaks[hid] = {
+            "current": int(column[-1]),
+            "best": int(column.max()),
+            "last_date": str(matrix.dates[-1]),
+            "before": int(column[-2]) if len(column) > 1 else 0,
+        }
+    return streaks
+
+
+def load_matrix(store, username, checkins, habit_sets):
+    # Returns the stored matrix, rebuilding and re-saving it if it is missing or out of date.
+    # A new plan alone doesn't make it stale: its habits are columns (or empty) by ID.
+    data = store.load_blob(username, BLOB_NAME)
+    matrix = CheckinMatrix.from_bytes(data) if data else None
+    if matrix is None or matrix.n_checkins != len(checkins):
+        matrix = CheckinMatrix.from_checkins(checkins, habit_sets)
+        store.save_blob(username, BLOB_NAME, matrix.to_bytes())
+    return matrix
+
+
+def save_matrix(store, username, matrix):
+    store.save_blob(username, BLOB_NAME, matrix.to_bytes())
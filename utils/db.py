@@ -0,0 +1,49 @@
+import sqlite3
+import threading
+
+# Shared plumbing for the SQLite-backed stores (users, signups, plan index, AI cache, outbox) and
+# the process-wide instances the app reaches them through.
+
+
+class ThreadLocalConnection:
+    """Calling it returns this thread's WAL-mode connection to path, opened on first use."""
+
+    # sqlite3 connections are not shareable across threads; Streamlit runs each session in its own.
+    # init(conn), if given, runs on every new connection (e.g. CREATE TABLE IF NOT EXISTS).
+
+    def __init__(self, path, init=None):
+        self.path = path
+        self.init = init
+        self._local = threading.local()
+
+    def __call__(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            if self.init:
+                self.init(conn)
+            self._local.conn = conn
+        return conn
+
+
+class ProcessSingleton:
+    """Builds factory() once per process on the first get(), even with sessions racing for it."""
+
+    def __init__(self, factory):
+        self.factory = factory
+        self.instance = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        if self.instance is None:
+            with self._lock:
+                if self.instance is None:
+                    self.instance = self.factory()
+        return self.instance
+
+    def set(self, instance):
+        # Replaces the shared instance (benchmarks point it at a temp file)
+        with self._lock:
+            self.instance = instance
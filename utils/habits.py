@@ -0,0 +1,61 @@
+import hashlib
+import re
+
+# Habit-set versions. Every plan's habits are registered as a list of stable IDs (a hash of the
+# normalised habit text), appended to the record's "habit_sets" only when it differs from the
+# latest one; "habit_names" maps each ID to its most recent wording. A check-in stores the
+# version it was made against ("v") next to its positional "checked" flags, so flag i always
+# belongs to habit_sets[v][i], whatever plans were generated since. A habit kept across a
+# regenerate keeps its ID and with it its streak and adherence history.
+#
+# Records written before versions existed are migrated by ensure_habit_sets(): their current
+# habits become version 0, and check-ins without "v" are read as version 0.
+
+_NUMBERING_RE = re.compile(r"^\s*(?:[-*•]+\s*|\d+[.)]\s*)+")
+_MARKUP_RE = re.compile(r"[*_`]+")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def normalize_habit(text):
+    text = _MARKUP_RE.sub("", text or "")
+    text = _NUMBERING_RE.sub("", text)
+    return _SPACE_RE.sub(" ", text).strip().rstrip(".!").lower()
+
+
+def habit_id(text):
+    return "h-" + hashlib.sha1(normalize_habit(text).encode("utf-8")).hexdigest()[:12]
+
+
+def ensure_habit_sets(data):
+    # In-place migration of a pre-version record; returns True if anything changed
+    if "habit_sets" in data:
+        return False
+    habits = data.get("habits") or []
+    ids = [habit_id(h) for h in habits]
+    data["habit_sets"] = [ids] if ids else []
+    data["habit_names"] = dict(zip(ids, habits))
+    # Streaks used to be keyed by habit text
+    if data.get("streaks") and set(data["streaks"]) == set(habits):
+        data["streaks"] = {habit_id(h): state for h, state in data["streaks"].items()}
+    return True
+
+
+def register_habits(data, habits):
+    # Records the plan's habits as the current set; returns its version number
+    ensure_habit_sets(data)
+    ids = [habit_id(h) for h in habits]
+    sets = data["habit_sets"]
+    data["habit_names"] = {**data.get("habit_names", {}), **dict(zip(ids, habits))}
+    if not sets or sets[-1] != ids:
+        sets.append(ids)
+    return len(sets) - 1
+
+
+def current_ids(habit_sets):
+    return habit_sets[-1] if habit_sets else []
+
+
+def checkin_ids(habit_sets, checkin):
+    # Habit IDs that the check-in's positional "checked" flags refer to
+    version = checkin.get("v", 0)
+    return habit_sets[version] if version < len(habit_sets) else []
@@ -0,0 +1,244 @@
+import base64
+import hashlib
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from utils.db import ThreadLocalConnection
+from utils.tracing import span
+
+# Persistent email outbox: the page only enqueues, a small worker pool delivers to SendGrid
+# over a pooled HTTP session, retrying 429/5xx/network errors with exponential backoff.
+#
+# Status of a message: queued -> sending -> sent | failed (queued again while retrying)
+
+OUTBOX_FILE = os.path.join("data", "outbox.db")
+SENDGRID_URL = os.environ.get("EVERAGE_SENDGRID_URL", "https://api.sendgrid.com/v3/mail/send")
+MAX_ATTEMPTS = 6
+BACKOFF_BASE_SECONDS = 2.0
+BACKOFF_MAX_SECONDS = 300.0
+# A message stuck in "sending" longer than this (worker crashed) is picked up again
+LEASE_SECONDS = 120
+HTTP_TIMEOUT = (5, 30)
+POLL_INTERVAL_SECONDS = 1.0
+
+logger = logging.getLogger(__name__)
+
+_config = {"api_key": None, "from_email": None, "url": SENDGRID_URL}
+_local = threading.local()
+_connections = {}
+_workers = []
+_workers_lock = threading.Lock()
+_wakeup = threading.Event()
+
+
+def configure(api_key, from_email, url=None, path=None):
+    _config["api_key"] = api_key
+    _config["from_email"] = from_email
+    if url:
+        _config["url"] = url
+    if path:
+        _config["path"] = path
+
+
+def _create_schema(conn):
+    with conn:
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS outbox ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " idempotency_key TEXT NOT NULL UNIQUE,"
+            " to_email TEXT NOT NULL,"
+            " subject TEXT NOT NULL,"
+            " body TEXT NOT NULL,"
+            " attachment BLOB,"
+            " filename TEXT,"
+            " status TEXT NOT NULL,"
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " next_attempt_at REAL NOT NULL,"
+            " last_error TEXT,"
+            " created_at REAL NOT NULL,"
+            " updated_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS outbox_due ON outbox (status, next_attempt_at)")
+
+
+def _conn():
+    # One connection set per outbox file (configure(path=...) can point it elsewhere)
+    path = _config.get("path", OUTBOX_FILE)
+    connections = _connections.get(path)
+    if connections is None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        connections = _connections.setdefault(path, ThreadLocalConnection(path, init=_create_schema))
+    return connections()
+
+
+# ========== ENQUEUE / STATUS ==========
+def idempotency_key(to_email, subject, attachment, nonce=""):
+    h = hashlib.sha256(f"{to_email.strip().lower()}\n{subject}\n{nonce}\n".encode("utf-8"))
+    h.update(attachment or b"")
+    return h.hexdigest()
+
+
+def enqueue_email(to_email, subject, body, attachment=None, filename=None, key=None, nonce=""):
+    # Returns the message id. The same key (by default: recipient + subject + attachment + nonce)
+    # maps to the same message, so a double click doesn't send twice; a failed message is queued
+    # again. Callers pass a new nonce for each deliberate send, so a repeat isn't swallowed.
+    key = key or idempotency_key(to_email, subject, attachment, nonce)
+    now = time.time()
+    conn = _conn()
+    with conn:
+        conn.execute(
+            "INSERT OR IGNORE INTO outbox (idempotency_key, to_email, subject, body, attachment, filename,"
+            " status, next_attempt_at, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, 'queued', ?, ?, ?)",
+            (key, to_email, subject, body, attachment, filename, now, now, now),
+        )
+        conn.execute(
+            "UPDATE outbox SET status = 'queued', attempts = 0, next_attempt_at = ?, updated_at = ?"
+            " WHERE idempotency_key = ? AND status = 'failed'",
+            (now, now, key),
+        )
+        message_id = conn.execute("SELECT id FROM outbox WHERE idempotency_key = ?", (key,)).fetchone()[0]
+    _wakeup.set()
+    return message_id
+
+
+def email_status(message_id):
+    row = _conn().execute(
+        "SELECT status, attempts, last_error, updated_at FROM outbox WHERE id = ?", (message_id,)
+    ).fetchone()
+    if row is None:
+        return None
+    return {"status": row[0], "attempts": row[1], "last_error": row[2], "updated_at": row[3]}
+
+
+def queue_depth():
+    return _conn().execute("SELECT COUNT(*) FROM outbox WHERE status IN ('queued', 'sending')").fetchone()[0]
+
+
+# ========== DELIVERY ==========
+def _session():
+    # One pooled, keep-alive session per worker thread
+    session = getattr(_local, "session", None)
+    if session is None:
+        session = requests.Session()
+        session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=4))
+        session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=4))
+        _local.session = session
+    return session
+
+
+def sendgrid_payload(to_email, subject, body, attachment, filename, from_email):
+    data = {
+        "personalizations": [{"to": [{"email": to_email}], "subject": subject}],
+        "from": {"email": from_email},
+        "content": [{"type": "text/plain", "value": body}],
+    }
+    if attachment:
+        data["attachments"] = [{
+            "content": base64.b64encode(attachment).decode(),
+            "type": "application/pdf",
+            "filename": filename or "attachment.pdf",
+        }]
+    return data
+
+
+def _claim_next():
+    now = time.time()
+    conn = _conn()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        row = conn.execute(
+            "SELECT id, to_email, subject, body, attachment, filename, attempts FROM outbox"
+            " WHERE (status = 'queued' AND next_attempt_at <= ?) OR (status = 'sending' AND next_attempt_at <= ?)"
+            " ORDER BY next_attempt_at LIMIT 1",
+            (now, now - LEASE_SECONDS),
+        ).fetchone()
+        if row:
+            conn.execute(
+                "UPDATE outbox SET status = 'sending', attempts = attempts + 1, next_attempt_at = ?, updated_at = ? WHERE id = ?",
+                (now, now, row[0]),
+            )
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    return row
+
+
+def _finish(message_id, status, attempts, error=None):
+    now = time.time()
+    next_attempt = now
+    if status == "queued":
+        delay = min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** (attempts - 1))
+        next_attempt = now + delay * random.uniform(0.5, 1.0)
+    conn = _conn()
+    with conn:
+        conn.execute(
+            "UPDATE outbox SET status = ?, next_attempt_at = ?, last_error = ?, updated_at = ? WHERE id = ?",
+            (status, next_attempt, error, now, message_id),
+        )
+
+
+def deliver_one():
+    # Sends one due message; returns False if nothing was due
+    row = _claim_next()
+    if row is None:
+        return False
+    message_id, to_email, subject, body, attachment, filename, attempts = row
+    attempts += 1
+    try:
+        with span("sendgrid.send"):
+            response = _session().post(
+                _config["url"],
+                headers={"Authorization": f"Bearer {_config['api_key']}", "Content-Type": "application/json"},
+                json=sendgrid_payload(to_email, subject, body, attachment, filename, _config["from_email"]),
+                timeout=HTTP_TIMEOUT,
+            )
+    except requests.RequestException as e:
+        retryable, error = True, f"{type(e).__name__}: {e}"
+    except Exception as e:
+        # A bug, not a delivery problem: retrying won't help, and the message mustn't sit in "sending"
+        logger.exception("Outbox message %s could not be sent", message_id)
+        retryable, error = False, f"{type(e).__name__}: {e}"
+    else:
+        if 200 <= response.status_code < 300:
+            _finish(message_id, "sent", attempts)
+            return True
+        retryable = response.status_code == 429 or response.status_code >= 500
+        error = f"HTTP {response.status_code}: {response.text[:200]}"
+    if retryable and attempts < MAX_ATTEMPTS:
+        _finish(message_id, "queued", attempts, error)
+    else:
+        _finish(message_id, "failed", attempts, error)
+    return True
+
+
+def _worker_loop():
+    # Nothing may end the loop: a dead worker leaves queued emails undelivered
+    while True:
+        try:
+            if deliver_one():
+                continue
+        except sqlite3.Error:
+            pass
+        except Exception:
+            logger.exception("Outbox worker error")
+        _wakeup.wait(POLL_INTERVAL_SECONDS)
+        _wakeup.clear()
+
+
+def ensure_workers(count=2):
+    # Starts the worker pool once per process, replacing any worker that died; safe to call on
+    # every rerun
+    with _workers_lock:
+        _workers[:] = [t for t in _workers if t.is_alive()]
+        while len(_workers) < count:
+            t = threading.Thread(target=_worker_loop, name=f"everage-outbox-{len(_workers)}", daemon=True)
+            t.start()
+            _workers.append(t)
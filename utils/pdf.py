@@ -1,14 +1,75 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
 from fpdf import FPDF
-import base64
 
-def generate_pdf(plan):
+from utils.tracing import span
+
+LOGO_PATH = os.path.join("static", "everage_full_logo.png")
+PDF_CACHE_SIZE = 64
+
+_pdf_cache = OrderedDict()
+_pdf_cache_lock = threading.Lock()
+_logo_info = {}
+
+
+def plan_hash(plan):
+    return hashlib.sha256(plan.encode("utf-8")).hexdigest()
+
+
+def _add_logo(pdf, path=LOGO_PATH, x=None, y=None, w=0):
+    # FPDF parses (and zlib-decodes) the PNG on first use per document. Seed the document's
+    # image table with the info parsed once per process, keyed on the file's mtime.
+    mtime = os.path.getmtime(path)
+    cached = _logo_info.get(path)
+    if cached is None or cached[0] != mtime:
+        probe = FPDF()
+        probe.add_page()
+        probe.image(path, x=0, y=0, w=1)
+        cached = (mtime, probe.images[path])
+        _logo_info[path] = cached
+    if hasattr(pdf, "images") and path not in pdf.images:
+        pdf.images[path] = dict(cached[1], i=len(pdf.images) + 1)
+    pdf.image(path, x=x, y=y, w=w)
+
+
+def render_text_pdf(text):
+    # The EverAge layout: small top-right logo, text below
     pdf = FPDF()
     pdf.add_page()
+
+    # 🧬 Small top-right logo
+    logo_width = 30
+    margin_right = 10
+    margin_top = 8
+    logo_x = pdf.w - logo_width - margin_right
+    _add_logo(pdf, x=logo_x, y=margin_top, w=logo_width)
+
+    # 📝 Content below
+    pdf.set_y(28)
     pdf.set_font("Arial", size=12)
-    pdf.multi_cell(0, 10, plan)
-    filename = "longevity_plan.pdf"
-    pdf.output(filename)
-    with open(filename, "rb") as f:
-        b64 = base64.b64encode(f.read()).decode()
-    href = f'<a href="data:application/octet-stream;base64,{b64}" download="longevity_plan.pdf">📄 Download Plan as PDF</a>'
-    return href
+    pdf.multi_cell(0, 10, text)
+    out = pdf.output(dest="S")
+    return out.encode("latin-1") if isinstance(out, str) else bytes(out)
+
+
+def render_plan_pdf(plan):
+    return render_text_pdf(plan)
+
+
+def plan_pdf_bytes(plan):
+    # In-memory PDF for a plan, cached by plan hash (LRU); nothing is written to disk
+    key = plan_hash(plan)
+    with _pdf_cache_lock:
+        if key in _pdf_cache:
+            _pdf_cache.move_to_end(key)
+            return _pdf_cache[key]
+    with span("pdf.render"):
+        data = render_plan_pdf(plan)
+    with _pdf_cache_lock:
+        _pdf_cache[key] = data
+        while len(_pdf_cache) > PDF_CACHE_SIZE:
+            _pdf_cache.popitem(last=False)
+    return data
@@ -0,0 +1,63 @@
+import gzip
+import hashlib
+import os
+from functools import lru_cache
+
+# Plan history in two tiers. The user record keeps the latest HOT_PLANS plan texts in "history"
+# and only content hashes of the older ones in "history_archive" (oldest first). Archived texts
+# are gzip blobs keyed by their hash, so a plan served to many users (cache, plan index) is
+# stored once, and they are read only when the history viewer asks for one.
+
+HOT_PLANS = int(os.environ.get("EVERAGE_HOT_PLANS", 3))
+# Blob owner for the shared archive; no user can log in with an empty name
+ARCHIVE_OWNER = ""
+
+
+def plan_key(text):
+    return "plan-" + hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def archive_plan(store, text):
+    # Idempotent: the same text always lands in the same blob
+    key = plan_key(text)
+    if store.load_blob(ARCHIVE_OWNER, key) is None:
+        store.save_blob(ARCHIVE_OWNER, key, gzip.compress(text.encode("utf-8"), compresslevel=6))
+    return key
+
+
+@lru_cache(maxsize=64)
+def load_archived_plan(store, key):
+    # Blobs are immutable (content-addressed), so they can be cached for the life of the process
+    data = store.load_blob(ARCHIVE_OWNER, key)
+    if data is None:
+        return None
+    return gzip.decompress(data).decode("utf-8")
+
+
+def archive_overflow(store, data):
+    # Writes the hot plans that the next push_plan() will evict, *before* the record update:
+    # blob writes can't join the record's transaction. Returns the keys that are safe to evict.
+    hot = data.get("history") or []
+    return {archive_plan(store, text) for text in hot[:max(0, len(hot) + 1 - HOT_PLANS)]}
+
+
+def push_plan(data, plan, archived):
+    # Appends a plan to the record's hot tier and moves the oldest ones to the archive. A plan
+    # whose blob wasn't written beforehand (another session changed the history) stays hot.
+    hot = data.setdefault("history", [])
+    archive = data.setdefault("history_archive", [])
+    hot.append(plan)
+    while len(hot) > HOT_PLANS and plan_key(hot[0]) in archived:
+        archive.append(plan_key(hot.pop(0)))
+
+
+def plan_count(hot, archive):
+    return len(archive or []) + len(hot or [])
+
+
+def get_plan(store, hot, archive, index):
+    # index counts from the oldest plan, across both tiers
+    archive = archive or []
+    if index >= len(archive):
+        return hot[index - len(archive)]
+    return load_archived_plan(store, archive[index])
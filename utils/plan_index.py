@@ -0,0 +1,239 @@
+import json
+import os
+import re
+import threading
+import time
+import zlib
+
+import numpy as np
+
+from utils.db import ProcessSingleton, ThreadLocalConnection
+
+# Nearest-neighbour reuse of generated plans. Profiles live in a small discrete space (age band,
+# activity, sleep, stress, diet) plus free-text goals, so many plan requests are near-duplicates.
+# Plans are bucketed by the structured fields; within a bucket the closest stored plan by goals
+# (cosine similarity of a hashed bag-of-words embedding) is served if it clears the threshold
+# AND has exactly the same content words. Similarity alone treats "lose weight" and "gain weight"
+# as near-duplicates; the content-word key (function words dropped, negations kept) keeps a plan
+# from being served to anyone whose goals differ in a word that matters.
+#
+# One plan per bucket + content-word key, and at most BUCKET_CAP per bucket (least served go first).
+
+INDEX_FILE = os.path.join("data", "plan_index.db")
+SIMILARITY_THRESHOLD = float(os.environ.get("EVERAGE_PLAN_REUSE_THRESHOLD", 0.9))
+BUCKET_CAP = int(os.environ.get("EVERAGE_PLAN_INDEX_BUCKET_CAP", 200))
+EMBEDDING_DIM = 1024
+AGE_BAND_YEARS = 10
+PROFILE_FIELDS = ["age", "activity", "sleep", "stress", "diet", "goals"]
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+# Dropped from the content-word key; negations ("no", "not", "without"...) are deliberately kept
+STOPWORDS = {
+    "a", "an", "the", "and", "or", "to", "of", "in", "on", "at", "for", "with", "by", "from", "as",
+    "i", "im", "ive", "id", "me", "my", "myself", "we", "our", "be", "am", "is", "are", "was", "been",
+    "want", "wants", "would", "like", "wish", "hope", "hoping", "trying", "try", "goal", "goals",
+    "please", "some", "just", "really", "very", "also", "so", "that", "this", "it", "its",
+}
+
+
+def profile_prompt(profile):
+    return (f"Age: {profile['age']}, Activity: {profile['activity']}, Sleep: {profile['sleep']}, "
+            f"Stress: {profile['stress']}, Diet: {profile['diet']}, Goals: {profile['goals']}")
+
+
+def profile_bucket(profile):
+    band = int(profile["age"]) // AGE_BAND_YEARS * AGE_BAND_YEARS
+    return f"{band}|{profile['activity']}|{profile['sleep']}|{profile['stress']}|{profile['diet']}"
+
+
+def goals_key(text):
+    # Sorted content words, with a trailing plural "s" dropped: word order and filler don't matter
+    words = set()
+    for word in _TOKEN_RE.findall((text or "").lower()):
+        if word in STOPWORDS:
+            continue
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        words.add(word)
+    return " ".join(sorted(words))
+
+
+def embed_goals(text):
+    # Feature hashing of words, word pairs and character trigrams into a fixed-size unit vector.
+    # crc32 (unlike hash()) is stable across processes, so stored vectors stay comparable.
+    words = [w for w in _TOKEN_RE.findall((text or "").lower()) if w not in STOPWORDS]
+    features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    for word in words:
+        padded = f"#{word}#"
+        features += [padded[i:i + 3] for i in range(len(padded) - 2)]
+    vector = np.zeros(EMBEDDING_DIM, dtype=np.float32)
+    for feature in features:
+        h = zlib.crc32(feature.encode("utf-8"))
+        vector[h % EMBEDDING_DIM] += 1.0 if h & 0x80000000 else -1.0
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def similarity(vector, matrix):
+    # Cosine similarity of unit vectors; two empty goal texts count as identical
+    if not vector.any():
+        return np.where(matrix.any(axis=1), 0.0, 1.0)
+    return matrix @ vector
+
+
+class PlanIndex:
+    """Stored plans by profile bucket, with a brute-force vector search per bucket (SQLite-backed)."""
+
+    def __init__(self, path=INDEX_FILE, threshold=SIMILARITY_THRESHOLD, bucket_cap=BUCKET_CAP):
+        self.path = path
+        self.threshold = threshold
+        self.bucket_cap = bucket_cap
+        self.hits = 0
+        self.misses = 0
+        self.lookup_seconds = 0.0
+        self.generation_seconds = 0.0
+        self.generations = 0
+        self._lock = threading.Lock()
+        self._conn = ThreadLocalConnection(path)
+        # bucket -> (row ids, goals keys, embedding matrix, highest id loaded)
+        self._buckets = {}
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS plans ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " bucket TEXT NOT NULL,"
+                " goals TEXT NOT NULL,"
+                " embedding BLOB NOT NULL,"
+                " plan TEXT NOT NULL,"
+                " habits TEXT NOT NULL,"
+                " scores TEXT NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " served INTEGER NOT NULL DEFAULT 0,"
+                " goals_key TEXT)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS plans_bucket ON plans (bucket, id)")
+            # Indexes written before content-word keys: add the column, fill it, drop duplicates
+            if "goals_key" not in [row[1] for row in conn.execute("PRAGMA table_info(plans)")]:
+                conn.execute("ALTER TABLE plans ADD COLUMN goals_key TEXT")
+            rows = conn.execute("SELECT id, goals FROM plans WHERE goals_key IS NULL").fetchall()
+            conn.executemany(
+                "UPDATE plans SET goals_key = ?, embedding = ? WHERE id = ?",
+                [(goals_key(g), embed_goals(g).tobytes(), i) for i, g in rows],
+            )
+            conn.execute(
+                "DELETE FROM plans WHERE id NOT IN (SELECT MIN(id) FROM plans GROUP BY bucket, goals_key)"
+            )
+            conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS plans_goals ON plans (bucket, goals_key)")
+
+    def _vectors(self, bucket):
+        # Loads the bucket once, then only rows added since (by this or another process); reloads
+        # it whole if rows were removed (evicted, or withdrawn on Regenerate)
+        empty = ([], [], np.zeros((0, EMBEDDING_DIM), np.float32), 0)
+        with self._lock:
+            ids, keys, matrix, last_id = self._buckets.get(bucket, empty)
+        conn = self._conn()
+        rows = conn.execute(
+            "SELECT id, goals_key, embedding FROM plans WHERE bucket = ? AND id > ? ORDER BY id", (bucket, last_id)
+        ).fetchall()
+        count = conn.execute("SELECT COUNT(*) FROM plans WHERE bucket = ?", (bucket,)).fetchone()[0]
+        reload = len(ids) + len(rows) != count
+        if reload:
+            ids, keys, matrix, last_id = empty
+            rows = conn.execute(
+                "SELECT id, goals_key, embedding FROM plans WHERE bucket = ? ORDER BY id", (bucket,)
+            ).fetchall()
+        if rows or reload:
+            ids = ids + [row[0] for row in rows]
+            keys = keys + [row[1] for row in rows]
+            matrix = np.vstack([matrix] + [np.frombuffer(row[2], dtype=np.float32) for row in rows])
+            with self._lock:
+                self._buckets[bucket] = (ids, keys, matrix, ids[-1] if ids else 0)
+        return ids, keys, matrix
+
+    def lookup(self, profile):
+        # Returns {"plan", "habits", "scores", "similarity"} of the closest stored plan, or None
+        start = time.perf_counter()
+        ids, keys, matrix = self._vectors(profile_bucket(profile))
+        match = None
+        key = goals_key(profile.get("goals"))
+        if key in keys:
+            best = keys.index(key)
+            score = float(similarity(embed_goals(profile.get("goals")), matrix[best:best + 1])[0])
+            conn = self._conn()
+            row = conn.execute("SELECT plan, habits, scores FROM plans WHERE id = ?", (ids[best],)).fetchone()
+            if row and score >= self.threshold:
+                with conn:
+                    conn.execute("UPDATE plans SET served = served + 1 WHERE id = ?", (ids[best],))
+                match = {
+                    "plan": row[0],
+                    "habits": json.loads(row[1]),
+                    "scores": json.loads(row[2]),
+                    "similarity": score,
+                }
+        with self._lock:
+            self.lookup_seconds += time.perf_counter() - start
+            if match:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return match
+
+    def add(self, profile, plan, habits, scores, generation_seconds=None):
+        # Keeps the first plan stored for a bucket + content-word key. generation_seconds (how long
+        # the model took) feeds the latency-savings estimate.
+        bucket = profile_bucket(profile)
+        conn = self._conn()
+        with conn:
+            cur = conn.execute(
+                "INSERT OR IGNORE INTO plans (bucket, goals, goals_key, embedding, plan, habits, scores, created_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (bucket, profile.get("goals") or "", goals_key(profile.get("goals")),
+                 embed_goals(profile.get("goals")).tobytes(), plan, json.dumps(habits), json.dumps(scores), time.time()),
+            )
+            # Over the cap, the least served (oldest first) make room; the new plan always stays
+            new_id = cur.lastrowid if cur.rowcount else 0
+            conn.execute(
+                "DELETE FROM plans WHERE id IN (SELECT id FROM plans WHERE bucket = ? AND id != ?"
+                " ORDER BY served DESC, id DESC LIMIT -1 OFFSET ?)",
+                (bucket, new_id, self.bucket_cap - 1 if new_id else self.bucket_cap),
+            )
+        if generation_seconds is not None:
+            with self._lock:
+                self.generation_seconds += generation_seconds
+                self.generations += 1
+
+    def remove(self, plan):
+        # Withdraws a plan (e.g. one the user just regenerated away) so it isn't served again
+        conn = self._conn()
+        with conn:
+            return conn.execute("DELETE FROM plans WHERE plan = ?", (plan,)).rowcount
+
+    def stats(self):
+        size = self._conn().execute("SELECT COUNT(*) FROM plans").fetchone()[0]
+        with self._lock:
+            lookups = self.hits + self.misses
+            avg_generation = self.generation_seconds / self.generations if self.generations else 0.0
+            avg_lookup = self.lookup_seconds / lookups if lookups else 0.0
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": size,
+                "avg_lookup_ms": avg_lookup * 1000,
+                "avg_generation_seconds": avg_generation,
+                # Each hit skipped one generation at the observed average cost
+                "saved_seconds": self.hits * max(0.0, avg_generation - avg_lookup),
+            }
+
+
+_index = ProcessSingleton(PlanIndex)
+
+
+def get_plan_index():
+    return _index.get()
+
+
+def plan_index_stats():
+    return get_plan_index().stats()
@@ -0,0 +1,163 @@
+import os
+import random
+import threading
+import time
+from collections import deque
+
+import openai
+
+from utils import tracing
+
+# Process-wide OpenAI budget shared by every Streamlit session: requests/min and tokens/min
+# token buckets, a FIFO queue so callers are served in arrival order, and jittered retries
+# for 429/5xx/network errors. All completion calls go through limited_create().
+
+OPENAI_RPM = float(os.environ.get("EVERAGE_OPENAI_RPM", 500))
+OPENAI_TPM = float(os.environ.get("EVERAGE_OPENAI_TPM", 200000))
+MAX_RETRIES = 5
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 30.0
+# Assumed completion size when reserving tokens up front; corrected from usage afterwards
+EXPECTED_COMPLETION_TOKENS = 800
+
+# Retries are handled here (with the shared budget in mind), not by the SDK's own retry loop
+openai.max_retries = 0
+
+
+class TokenBucket:
+    def __init__(self, per_minute):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.level = per_minute
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def time_until(self, amount):
+        self._refill()
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def take(self, amount):
+        self._refill()
+        self.level -= amount
+
+
+class RateLimiter:
+    def __init__(self, rpm=OPENAI_RPM, tpm=OPENAI_TPM):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self._cond = threading.Condition()
+        self._queue = deque()
+        self._waits = deque(maxlen=1000)
+        self.calls = 0
+        self.retries = 0
+        self.rate_limited = 0
+
+    def acquire(self, tokens):
+        # Blocks until both budgets allow the call; only the head of the queue may take budget
+        tokens = min(tokens, self.tokens.capacity)
+        ticket = object()
+        start = time.monotonic()
+        with self._cond:
+            self._queue.append(ticket)
+            try:
+                while True:
+                    if self._queue[0] is ticket:
+                        delay = max(self.requests.time_until(1), self.tokens.time_until(tokens))
+                        if delay <= 0:
+                            self.requests.take(1)
+                            self.tokens.take(tokens)
+                            break
+                        self._cond.wait(delay)
+                    else:
+                        self._cond.wait()
+            finally:
+                self._queue.remove(ticket)
+                self._cond.notify_all()
+            wait = time.monotonic() - start
+            self._waits.append(wait)
+            self.calls += 1
+        tracing.observe("openai.wait", wait)
+        tracing.count("openai.calls")
+
+    def count(self, name):
+        # Also reported as openai.<name> in the tracing counters (admin panel, Prometheus)
+        with self._cond:
+            setattr(self, name, getattr(self, name) + 1)
+        tracing.count(f"openai.{name}")
+
+    def settle(self, reserved, used):
+        # Returns unused reserved tokens (or charges the overrun) once actual usage is known
+        with self._cond:
+            self.tokens.take(used - min(reserved, self.tokens.capacity))
+            self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            waits = sorted(self._waits)
+            depth = len(self._queue)
+        pick = lambda q: waits[min(len(waits) - 1, int(len(waits) * q))] if waits else 0.0
+        return {
+            "queue_depth": depth,
+            "calls": self.calls,
+            "retries": self.retries,
+            "rate_limited": self.rate_limited,
+            "wait_p50": pick(0.5),
+            "wait_p95": pick(0.95),
+            "wait_max": waits[-1] if waits else 0.0,
+        }
+
+
+_limiter = RateLimiter()
+
+
+def get_limiter():
+    return _limiter
+
+
+def estimate_tokens(messages):
+    # ~4 characters per token is close enough for budgeting
+    return sum(len(m.get("content") or "") for m in messages) // 4 + EXPECTED_COMPLETION_TOKENS
+
+
+def _retry_delay(error, attempt):
+    response = getattr(error, "response", None)
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    if retry_after:
+        try:
+            return float(retry_after)
+        except ValueError:
+            pass
+    # Full jitter: spreads retries from many sessions instead of having them collide again
+    return random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt))
+
+
+def _retryable(error):
+    if isinstance(error, (openai.RateLimitError, openai.APIConnectionError)):
+        return True
+    return isinstance(error, openai.APIStatusError) and error.status_code >= 500
+
+
+def limited_create(**kwargs):
+    # openai.chat.completions.create behind the shared budget, with our own retry policy
+    limiter = _limiter
+    reserved = estimate_tokens(kwargs.get("messages", []))
+    for attempt in range(MAX_RETRIES + 1):
+        limiter.acquire(reserved)
+        try:
+            response = openai.chat.completions.create(**kwargs)
+        except openai.APIError as e:
+            if isinstance(e, openai.RateLimitError):
+                limiter.count("rate_limited")
+            if not _retryable(e) or attempt == MAX_RETRIES:
+                raise
+            limiter.count("retries")
+            time.sleep(_retry_delay(e, attempt))
+            continue
+        usage = getattr(response, "usage", None)
+        if usage is not None and getattr(usage, "total_tokens", None):
+            limiter.settle(reserved, usage.total_tokens)
+        return response
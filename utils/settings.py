@@ -0,0 +1,16 @@
+import os
+
+SECRETS_FILE = os.path.join(".streamlit", "secrets.toml")
+
+
+def load_secrets(path=SECRETS_FILE):
+    # The same secrets the Streamlit app reads via st.secrets, for CLI jobs that run outside it
+    if not os.path.exists(path):
+        return {}
+    try:
+        import tomllib
+    except ImportError:  # Python < 3.11; toml ships with streamlit
+        import toml
+        return toml.load(path)
+    with open(path, "rb") as f:
+        return tomllib.load(f)
@@ -0,0 +1,122 @@
+import csv
+import json
+import os
+import time
+
+from utils.db import ProcessSingleton, ThreadLocalConnection
+
+# Landing-page email signups. Each address is stored once under its normalised form (trimmed,
+# lower-cased) behind a unique index, so recording a signup is a single INSERT OR IGNORE
+# whatever the list size, and two sessions submitting the same address can't race.
+#
+# The legacy data/emails.json list is imported on first open and renamed to emails.json.migrated.
+
+SIGNUPS_FILE = os.path.join("data", "signups.db")
+LEGACY_FILE = os.path.join("data", "emails.json")
+EXPORT_BATCH = 5000
+
+
+def normalize_email(email):
+    return (email or "").strip().lower()
+
+
+class SignupRegistry:
+    """Unique signup emails with first/last seen times and the entry point used (SQLite-backed)."""
+
+    def __init__(self, path=SIGNUPS_FILE, legacy_path=LEGACY_FILE):
+        self.path = path
+        self._conn = ThreadLocalConnection(path)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS signups ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " email_key TEXT NOT NULL UNIQUE,"
+                " email TEXT NOT NULL,"
+                " source TEXT,"
+                " created_at REAL NOT NULL,"
+                " last_seen_at REAL NOT NULL)"
+            )
+        if legacy_path and os.path.exists(legacy_path):
+            self.import_legacy(legacy_path)
+
+    def add(self, email, source=None):
+        # Returns True if the address is new
+        key = normalize_email(email)
+        now = time.time()
+        conn = self._conn()
+        with conn:
+            cur = conn.execute(
+                "INSERT OR IGNORE INTO signups (email_key, email, source, created_at, last_seen_at) VALUES (?, ?, ?, ?, ?)",
+                (key, email.strip(), source, now, now),
+            )
+            if cur.rowcount:
+                return True
+            conn.execute("UPDATE signups SET last_seen_at = ? WHERE email_key = ?", (now, key))
+        return False
+
+    def __contains__(self, email):
+        row = self._conn().execute("SELECT 1 FROM signups WHERE email_key = ?", (normalize_email(email),)).fetchone()
+        return row is not None
+
+    def count(self):
+        return self._conn().execute("SELECT COUNT(*) FROM signups").fetchone()[0]
+
+    def iter_signups(self):
+        # Yields {"email", "source", "created_at", "last_seen_at"} in signup order, a batch at a time
+        last_id = 0
+        while True:
+            rows = self._conn().execute(
+                "SELECT id, email, source, created_at, last_seen_at FROM signups WHERE id > ? ORDER BY id LIMIT ?",
+                (last_id, EXPORT_BATCH),
+            ).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield {"email": row[1], "source": row[2], "created_at": row[3], "last_seen_at": row[4]}
+            last_id = rows[-1][0]
+
+    def export(self, path):
+        # CSV for *.csv, otherwise a JSON list of addresses (the old emails.json format)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", newline="") as f:
+            if path.endswith(".csv"):
+                writer = csv.DictWriter(f, fieldnames=["email", "source", "created_at", "last_seen_at"])
+                writer.writeheader()
+                writer.writerows(self.iter_signups())
+            else:
+                json.dump([s["email"] for s in self.iter_signups()], f, indent=2)
+        os.replace(tmp_path, path)
+
+    def import_legacy(self, legacy_path):
+        # Safe to run from several processes at once: inserts are idempotent, one rename wins
+        try:
+            with open(legacy_path, "r") as f:
+                emails = json.load(f)
+        except FileNotFoundError:
+            return 0
+        now = time.time()
+        rows = {}
+        for email in emails:
+            key = normalize_email(email)
+            if key and key not in rows:
+                rows[key] = (key, email.strip(), "legacy", now, now)
+        conn = self._conn()
+        with conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO signups (email_key, email, source, created_at, last_seen_at) VALUES (?, ?, ?, ?, ?)",
+                list(rows.values()),
+            )
+        try:
+            os.replace(legacy_path, legacy_path + ".migrated")
+        except FileNotFoundError:
+            pass
+        return len(rows)
+
+
+_registry = ProcessSingleton(SignupRegistry)
+
+
+def get_signups():
+    return _registry.get()
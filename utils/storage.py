@@ -0,0 +1,489 @@
+import copy
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from contextlib import contextmanager
+from urllib.parse import quote
+
+from utils.db import ProcessSingleton, ThreadLocalConnection
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+DATA_DIR = "data"
+LEGACY_JSON_FILE = os.path.join(DATA_DIR, "user_data.json")
+SQLITE_FILE = os.path.join(DATA_DIR, "everage.db")
+BLOB_DIR = os.path.join(DATA_DIR, "blobs")
+
+# Which backend get_store() builds: "sqlite" (default) or "json" (legacy single file)
+STORAGE_BACKEND = os.environ.get("EVERAGE_STORAGE", "sqlite")
+# User records kept in memory by get_store(); 0 disables the cache
+USER_CACHE_SIZE = int(os.environ.get("EVERAGE_USER_CACHE_SIZE", 1024))
+# Pending events per user before they are folded into the stored record (SQLite backend)
+COMPACT_EVENTS = int(os.environ.get("EVERAGE_COMPACT_EVENTS", 50))
+
+
+def _dumps(data):
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+
+
+@contextmanager
+def _file_lock(lock_path):
+    # Exclusive inter-process lock held for the duration of the block
+    with open(lock_path, "a+b") as f:
+        if fcntl:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _atomic_write(path, text):
+    # Write to a temp file in the same directory, fsync, then rename over the target,
+    # so readers only ever see the old or the new file, never a truncated one
+    directory = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb" if isinstance(text, bytes) else "w") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+# ========== EVENTS ==========
+# Small mutations (a check-in, a few profile fields) are stored as events instead of rewriting the
+# whole record, so their cost doesn't grow with the plan history:
+#
+#   {"op": "set", "fields": {...}}                 top-level fields replaced
+#   {"op": "append", "field": "...", "value": ...}  one item added to a list field
+#   {"op": "checkin", "entry": {...}}              check-in appended, streaks advanced
+#
+# apply_event() never mutates a container already in the record (it assigns new ones), so it can
+# run on a shallow copy of a cached record that other sessions still read.
+def apply_event(data, event):
+    op = event["op"]
+    if op == "set":
+        data.update(event["fields"])
+    elif op == "append":
+        data[event["field"]] = list(data.get(event["field"]) or []) + [event["value"]]
+    elif op == "checkin":
+        from utils.habits import ensure_habit_sets
+        from utils.streaks import apply_checkin
+
+        ensure_habit_sets(data)
+        entry = event["entry"]
+        checkins = list(data.get("checkins") or []) + [entry]
+        streaks = copy.deepcopy(data.get("streaks") or {})
+        apply_checkin(streaks, entry, data["habit_sets"], checkins)
+        data["checkins"] = checkins
+        data["streaks"] = streaks
+    else:
+        raise ValueError(f"Unknown event op: {op}")
+    return data
+
+
+# ========== SQLITE BACKEND ==========
+class SQLiteUserStore:
+    """One row per user in a WAL-mode SQLite file. Reads and writes touch only that row."""
+
+    # The row is a snapshot; events appended since it was written sit in the events table and are
+    # replayed on load. Once a user has COMPACT_EVENTS of them they are folded into the snapshot
+    # (as is any pending tail when the whole record is rewritten by save_user/update_user).
+
+    def __init__(self, path=SQLITE_FILE):
+        self.path = path
+        self._conn = ThreadLocalConnection(path)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS users ("
+                " username TEXT PRIMARY KEY,"
+                " data TEXT NOT NULL,"
+                " updated_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            # Binary side data per user (e.g. the packed check-in matrix), kept out of the JSON record
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS blobs ("
+                " username TEXT NOT NULL,"
+                " name TEXT NOT NULL,"
+                " data BLOB NOT NULL,"
+                " PRIMARY KEY (username, name))"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS events ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " username TEXT NOT NULL,"
+                " event TEXT NOT NULL,"
+                " created_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS events_user ON events (username, id)")
+
+    def _replay(self, conn, username, data):
+        for (event,) in conn.execute("SELECT event FROM events WHERE username = ? ORDER BY id", (username,)):
+            apply_event(data, json.loads(event))
+        return data
+
+    def _read(self, conn, username):
+        row = conn.execute("SELECT data FROM users WHERE username = ?", (username,)).fetchone()
+        return self._replay(conn, username, json.loads(row[0]) if row else {})
+
+    def _write(self, conn, username, data):
+        # Full snapshot: any pending events are already part of data
+        conn.execute(
+            "INSERT INTO users (username, data, updated_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(username) DO UPDATE SET data = excluded.data, updated_at = excluded.updated_at",
+            (username, _dumps(data), time.time()),
+        )
+        conn.execute("DELETE FROM events WHERE username = ?", (username,))
+
+    def load_user(self, username):
+        # Snapshot and tail read in one transaction, so a concurrent compaction can't be seen halfway
+        conn = self._conn()
+        conn.execute("BEGIN")
+        try:
+            return self._read(conn, username)
+        finally:
+            conn.commit()
+
+    def save_user(self, username, data):
+        conn = self._conn()
+        with conn:
+            self._write(conn, username, data)
+
+    def update_user(self, username, mutate):
+        # Read-modify-write inside one IMMEDIATE transaction: concurrent updates to the same
+        # user are serialised by SQLite's write lock, so none of them is lost
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            data = self._read(conn, username)
+            mutate(data)
+            self._write(conn, username, data)
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        return data
+
+    def append_events(self, username, events, load=True):
+        # Returns the record with the events applied, replayed in the same transaction. Cost is the
+        # size of the events plus that read (skipped with load=False, which returns None), and a
+        # snapshot rewrite every COMPACT_EVENTS events.
+        now = time.time()
+        data = None
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT OR IGNORE INTO users (username, data, updated_at) VALUES (?, '{}', ?)", (username, now)
+            )
+            conn.executemany(
+                "INSERT INTO events (username, event, created_at) VALUES (?, ?, ?)",
+                [(username, _dumps(event), now) for event in events],
+            )
+            pending = conn.execute("SELECT COUNT(*) FROM events WHERE username = ?", (username,)).fetchone()[0]
+            if pending >= COMPACT_EVENTS:
+                data = self._compact(conn, username)
+            elif load:
+                data = self._read(conn, username)
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        return data
+
+    def _compact(self, conn, username):
+        data = self._read(conn, username)
+        self._write(conn, username, data)
+        return data
+
+    def compact(self, username=None):
+        # Folds pending events into the snapshot for one user, or every user that has some
+        conn = self._conn()
+        names = [username] if username else [r[0] for r in conn.execute("SELECT DISTINCT username FROM events")]
+        for name in names:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._compact(conn, name)
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+        return len(names)
+
+    def usernames(self):
+        return [r[0] for r in self._conn().execute("SELECT username FROM users ORDER BY username")]
+
+    def iter_users(self):
+        # Streams rows from the cursor so callers never hold the whole store in memory. Users with
+        # pending events are re-read through load_user() so the tail is applied consistently.
+        conn = self._conn()
+        with_events = {r[0] for r in conn.execute("SELECT DISTINCT username FROM events")}
+        for username, data in conn.execute("SELECT username, data FROM users ORDER BY username"):
+            yield username, self.load_user(username) if username in with_events else json.loads(data)
+
+    def load_blob(self, username, name):
+        row = self._conn().execute("SELECT data FROM blobs WHERE username = ? AND name = ?", (username, name)).fetchone()
+        return bytes(row[0]) if row else None
+
+    def save_blob(self, username, name, data):
+        conn = self._conn()
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO blobs (username, name, data) VALUES (?, ?, ?)", (username, name, data))
+
+    def get_meta(self, key):
+        row = self._conn().execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key, value):
+        conn = self._conn()
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def import_users(self, records, meta_key):
+        # Writes every (username, data) and sets meta_key in one IMMEDIATE transaction, unless
+        # meta_key is already set. Another process importing at the same time waits on the write
+        # lock and then finds the key, so the records are copied exactly once. Returns the count.
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if conn.execute("SELECT 1 FROM meta WHERE key = ?", (meta_key,)).fetchone():
+                conn.rollback()
+                return 0
+            count = 0
+            for username, data in records:
+                self._write(conn, username, data or {})
+                count += 1
+            conn.execute("INSERT INTO meta (key, value) VALUES (?, ?)", (meta_key, str(time.time())))
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        return count
+
+
+# ========== LEGACY JSON BACKEND ==========
+class JSONFileUserStore:
+    """The original layout: every user in one data/user_data.json dict."""
+
+    def __init__(self, path=LEGACY_JSON_FILE, blob_dir=BLOB_DIR):
+        self.path = path
+        self.lock_path = path + ".lock"
+        self.blob_dir = blob_dir
+        self._meta = {}
+
+    def _load_all(self):
+        if os.path.exists(self.path):
+            with open(self.path, "r") as f:
+                return json.load(f)
+        return {}
+
+    def _save_all(self, all_data):
+        _atomic_write(self.path, json.dumps(all_data, indent=2))
+
+    def load_user(self, username):
+        return self._load_all().get(username, {}) or {}
+
+    def save_user(self, username, data):
+        with _file_lock(self.lock_path):
+            all_data = self._load_all()
+            all_data[username] = data
+            self._save_all(all_data)
+
+    def update_user(self, username, mutate):
+        with _file_lock(self.lock_path):
+            all_data = self._load_all()
+            data = all_data.get(username, {}) or {}
+            mutate(data)
+            all_data[username] = data
+            self._save_all(all_data)
+        return data
+
+    def append_events(self, username, events, load=True):
+        # No separate log here: the single file is rewritten on every change anyway
+        return self.update_user(username, lambda data: [apply_event(data, event) for event in events])
+
+    def usernames(self):
+        return sorted(self._load_all())
+
+    def iter_users(self):
+        for username, data in sorted(self._load_all().items()):
+            yield username, data or {}
+
+    def _blob_path(self, username, name):
+        return os.path.join(self.blob_dir, quote(username, safe=""), quote(name, safe=""))
+
+    def load_blob(self, username, name):
+        path = self._blob_path(username, name)
+        if not os.path.exists(path):
+            return None
+        with open(path, "rb") as f:
+            return f.read()
+
+    def save_blob(self, username, name, data):
+        path = self._blob_path(username, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        _atomic_write(path, data)
+
+    def get_meta(self, key):
+        return self._meta.get(key)
+
+    def set_meta(self, key, value):
+        self._meta[key] = value
+
+
+# ========== PROCESS-WIDE RECORD CACHE ==========
+class CachedUserStore:
+    """Write-through LRU of user records in front of another store, shared by every session thread."""
+
+    # Reads of a cached user do no I/O; writes go to the underlying store, then replace the cached
+    # copy. Each user has a version stamp bumped on every write, so a read that raced with a write
+    # never puts the older record back. Cached records are shared between sessions: read-only.
+
+    def __init__(self, store, max_entries=USER_CACHE_SIZE):
+        self.store = store
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._records = OrderedDict()
+        self._versions = {}
+        self._write_locks = defaultdict(threading.Lock)
+
+    def __getattr__(self, name):
+        # Everything that isn't a user record (blobs, meta, iter_users...) goes straight through
+        return getattr(self.store, name)
+
+    def _install(self, username, version, data):
+        with self._lock:
+            if self._versions.get(username, 0) != version:
+                return
+            self._records[username] = data
+            self._records.move_to_end(username)
+            while len(self._records) > self.max_entries:
+                self._records.popitem(last=False)
+
+    def _bump(self, username):
+        with self._lock:
+            version = self._versions.get(username, 0) + 1
+            self._versions[username] = version
+            self._records.pop(username, None)
+        return version
+
+    def _write_lock(self, username):
+        with self._lock:
+            return self._write_locks[username]
+
+    def load_user(self, username):
+        with self._lock:
+            data = self._records.get(username)
+            if data is not None:
+                self._records.move_to_end(username)
+                self.hits += 1
+                return data
+            self.misses += 1
+            version = self._versions.get(username, 0)
+        data = self.store.load_user(username)
+        self._install(username, version, data)
+        return data
+
+    def save_user(self, username, data):
+        # Writes to one user are serialised here so the cache ends up with the last one stored
+        with self._write_lock(username):
+            self.store.save_user(username, data)
+            self._install(username, self._bump(username), data)
+
+    def update_user(self, username, mutate):
+        with self._write_lock(username):
+            data = self.store.update_user(username, mutate)
+            self._install(username, self._bump(username), data)
+        return data
+
+    def append_events(self, username, events):
+        # Applies the events to a copy of the cached record rather than re-reading the user
+        with self._write_lock(username):
+            with self._lock:
+                cached = self._records.get(username)
+            data = self.store.append_events(username, events, load=cached is None)
+            version = self._bump(username)
+            if cached is not None:
+                data = dict(cached)
+                for event in events:
+                    apply_event(data, event)
+            self._install(username, version, data)
+        return data
+
+    def invalidate(self, username=None):
+        # Drops one user (or everything), e.g. after another process changed the store
+        if username is not None:
+            self._bump(username)
+            return
+        with self._lock:
+            self._records.clear()
+            for name in self._versions:
+                self._versions[name] += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._records),
+            }
+
+
+# ========== MIGRATION ==========
+def migrate_json_to_store(store, json_path=LEGACY_JSON_FILE):
+    # One-shot: copies every user from the legacy file and records that it happened, atomically,
+    # so a second server process starting mid-migration can't copy (and overwrite) them again.
+    # The JSON file is left untouched so it can serve as a backup.
+    if store.get_meta("migrated_from_json") or not os.path.exists(json_path):
+        return 0
+    with open(json_path, "r") as f:
+        all_data = json.load(f)
+    return store.import_users(all_data.items(), "migrated_from_json")
+
+
+# ========== DEFAULT STORE ==========
+def _build_store():
+    if STORAGE_BACKEND == "json":
+        store = JSONFileUserStore()
+    else:
+        store = SQLiteUserStore()
+        migrate_json_to_store(store)
+    return CachedUserStore(store) if USER_CACHE_SIZE else store
+
+
+_store = ProcessSingleton(_build_store)
+
+
+def get_store():
+    return _store.get()
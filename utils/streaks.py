@@ -0,0 +1,74 @@
+from datetime import date, timedelta
+
+from utils.habits import checkin_ids
+
+# Streak state is kept per habit alongside the user record and updated in O(1) per check-in:
+#
+#   {"current": 3, "best": 7, "last_date": "2025-05-20", "before": 2}
+#
+# "current" is the run of consecutive done days ending at last_date, and "before" is the run
+# ending the day before last_date, which lets a second check-in on the same day be merged
+# without rescanning history. A day counts as done if any check-in that day ticked the habit.
+# State is keyed by habit ID (utils/habits.py), so a habit kept across plans keeps its streak.
+
+
+def new_streak_state():
+    return {"current": 0, "best": 0, "last_date": None, "before": 0}
+
+
+def _apply(state, day, done):
+    # Returns False if the check-in is older than the state and needs a full rebuild
+    last = date.fromisoformat(state["last_date"]) if state["last_date"] else None
+    if last is None or day > last:
+        state["before"] = state["current"] if last is not None and day - last == timedelta(days=1) else 0
+        state["current"] = state["before"] + 1 if done else 0
+        state["last_date"] = day.isoformat()
+    elif day == last:
+        done_today = done or state["current"] > 0
+        state["current"] = state["before"] + 1 if done_today else 0
+    else:
+        return False
+    state["best"] = max(state["best"], state["current"])
+    return True
+
+
+def rebuild_streaks(checkins, habit_sets):
+    # Full recomputation from the check-in history, for every habit ID in any version; the
+    # repair path for stale or missing state
+    days = {}
+    for entry in checkins:
+        flags = days.setdefault(entry["date"], {})
+        for hid, done in zip(checkin_ids(habit_sets, entry), entry["checked"]):
+            flags[hid] = flags.get(hid, False) or done
+    streaks = {hid: new_streak_state() for ids in habit_sets for hid in ids}
+    for day in sorted(days):
+        d = date.fromisoformat(day)
+        for hid, done in days[day].items():
+            _apply(streaks[hid], d, done)
+    return streaks
+
+
+def apply_checkin(streaks, checkin, habit_sets, checkins=None):
+    # Updates streaks in place for one new check-in. A habit ID without state yet is new to this
+    # plan and starts from zero. Falls back to a rebuild (which needs the full checkins list,
+    # including this one) if the check-in is back-dated or there is no state at all.
+    d = date.fromisoformat(checkin["date"])
+    ids = checkin_ids(habit_sets, checkin)
+    if not streaks and checkins:
+        streaks.update(rebuild_streaks(checkins, habit_sets))
+        return streaks
+    for hid in ids:
+        streaks.setdefault(hid, new_streak_state())
+    for hid, done in zip(ids, checkin["checked"]):
+        if not _apply(streaks[hid], d, done):
+            if checkins is None:
+                raise ValueError("Back-dated check-in; pass checkins to rebuild")
+            streaks.clear()
+            streaks.update(rebuild_streaks(checkins, habit_sets))
+            break
+    return streaks
+
+
+def streaks_match(streaks, habit_ids):
+    # Stored state covers every habit of the current set (it also keeps IDs of earlier plans)
+    return bool(streaks) and set(habit_ids) <= set(streaks)
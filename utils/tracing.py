@@ -0,0 +1,218 @@
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+
+# Lightweight stage timing for page reruns and background work.
+#
+#   with span("storage.load"):
+#       ...
+#
+# A rerun is one trace (start_trace/finish_trace); spans opened on the script thread add to that
+# trace's per-stage breakdown, and every span (any thread) feeds the process-wide p50/p95 stats.
+# observe() does the same for a duration measured elsewhere (e.g. time to first token), and
+# count() keeps process-wide event counters (cache hits, rate-limit retries...).
+# Off unless EVERAGE_TRACING=1; when off, span() hands back a shared no-op and costs one call.
+#
+# Sinks (optional): EVERAGE_TRACE_JSONL appends one line per rerun, EVERAGE_TRACE_PROM is
+# rewritten in Prometheus text format at most every PROM_INTERVAL_SECONDS.
+
+TRACING_ENABLED = os.environ.get("EVERAGE_TRACING", "0") == "1"
+TRACE_JSONL = os.environ.get("EVERAGE_TRACE_JSONL")
+TRACE_PROM = os.environ.get("EVERAGE_TRACE_PROM")
+PROM_INTERVAL_SECONDS = 10
+RECENT_TRACES = 50
+SAMPLES_PER_STAGE = 2000
+
+_local = threading.local()
+_lock = threading.Lock()
+_samples = defaultdict(lambda: deque(maxlen=SAMPLES_PER_STAGE))
+_totals = defaultdict(lambda: [0, 0.0])  # stage -> [count, sum] since start, for Prometheus
+_counters = defaultdict(int)
+_recent = deque(maxlen=RECENT_TRACES)
+_prom_lock = threading.Lock()
+_last_prom_write = [0.0]
+
+
+class _NoopSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+class Span:
+    __slots__ = ("name", "trace", "start")
+
+    def __init__(self, name):
+        self.name = name
+        self.trace = getattr(_local, "trace", None)
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter()
+        record(self.name, end - self.start)
+        if self.trace is not None:
+            self.trace.add(self.name, end - self.start, end)
+        return False
+
+
+class Trace:
+    def __init__(self, label):
+        self.label = label
+        self.at = time.time()
+        self.start = time.perf_counter()
+        self.last = self.start
+        self.stages = defaultdict(float)
+        self.counts = defaultdict(int)
+        self.finished = False
+
+    def add(self, name, seconds, end):
+        self.stages[name] += seconds
+        self.last = max(self.last, end)
+
+
+def span(name):
+    if not TRACING_ENABLED:
+        return _NOOP
+    return Span(name)
+
+
+def traced(name):
+    # Decorator form of span()
+    def decorate(fn):
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        wrapper.__name__ = fn.__name__
+        wrapper.__doc__ = fn.__doc__
+        return wrapper
+    return decorate
+
+
+def record(name, seconds):
+    with _lock:
+        _samples[name].append(seconds)
+        totals = _totals[name]
+        totals[0] += 1
+        totals[1] += seconds
+
+
+def observe(name, seconds):
+    # A duration timed by the caller, recorded like a span of that length ending now
+    if not TRACING_ENABLED:
+        return
+    record(name, seconds)
+    trace = getattr(_local, "trace", None)
+    if trace is not None:
+        trace.add(name, seconds, time.perf_counter())
+
+
+def count(name, n=1):
+    if not TRACING_ENABLED:
+        return
+    with _lock:
+        _counters[name] += n
+    trace = getattr(_local, "trace", None)
+    if trace is not None:
+        trace.counts[name] += n
+
+
+def start_trace(label, previous=None):
+    # Begins a rerun trace on this thread. A previous trace that never reached finish_trace()
+    # (st.stop() / st.rerun() mid-script) is closed at its last span.
+    if not TRACING_ENABLED:
+        return None
+    if previous is not None and not previous.finished:
+        _finish(previous, previous.last)
+    trace = Trace(label)
+    _local.trace = trace
+    return trace
+
+
+def finish_trace(trace):
+    if trace is None or trace.finished:
+        return
+    _finish(trace, time.perf_counter())
+    if getattr(_local, "trace", None) is trace:
+        _local.trace = None
+
+
+def _finish(trace, end):
+    trace.finished = True
+    total = end - trace.start
+    record("rerun", total)
+    entry = {"label": trace.label, "at": trace.at, "total": total, "stages": dict(trace.stages), "counts": dict(trace.counts)}
+    with _lock:
+        _recent.append(entry)
+    if TRACE_JSONL:
+        with _lock, open(TRACE_JSONL, "a") as f:
+            f.write(json.dumps(entry) + "\n")
+    if TRACE_PROM and time.time() - _last_prom_write[0] >= PROM_INTERVAL_SECONDS:
+        with _prom_lock:
+            if time.time() - _last_prom_write[0] >= PROM_INTERVAL_SECONDS:
+                _last_prom_write[0] = time.time()
+                write_prometheus(TRACE_PROM)
+
+
+# ========== REPORTING ==========
+def _quantile(values, q):
+    return values[min(len(values) - 1, int(len(values) * q))] if values else None
+
+
+def stage_stats():
+    # {stage: {"count", "p50", "p95", "max"}} over the recent samples of each stage
+    with _lock:
+        samples = {name: sorted(values) for name, values in _samples.items()}
+    return {
+        name: {"count": len(values), "p50": _quantile(values, 0.5), "p95": _quantile(values, 0.95), "max": values[-1]}
+        for name, values in sorted(samples.items()) if values
+    }
+
+
+def counter_stats():
+    # {name: count} since the process started
+    with _lock:
+        return dict(sorted(_counters.items()))
+
+
+def recent_traces(n=RECENT_TRACES):
+    with _lock:
+        return list(_recent)[-n:]
+
+
+def prometheus_text():
+    lines = [
+        "# HELP everage_stage_seconds Time spent per stage",
+        "# TYPE everage_stage_seconds summary",
+    ]
+    stats = stage_stats()
+    with _lock:
+        totals = {name: list(values) for name, values in _totals.items()}
+    for name, s in stats.items():
+        for key, q in (("p50", "0.5"), ("p95", "0.95")):
+            lines.append(f'everage_stage_seconds{{stage="{name}",quantile="{q}"}} {s[key]:.6f}')
+        count, total = totals.get(name, (0, 0.0))
+        lines.append(f'everage_stage_seconds_count{{stage="{name}"}} {count}')
+        lines.append(f'everage_stage_seconds_sum{{stage="{name}"}} {total:.6f}')
+    counters = counter_stats()
+    if counters:
+        lines += ["# HELP everage_events_total Events counted since start", "# TYPE everage_events_total counter"]
+        lines += [f'everage_events_total{{event="{name}"}} {value}' for name, value in counters.items()]
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(path):
+    # Atomic replace, so a scraper (e.g. node_exporter's textfile collector) never sees half a file
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        f.write(prometheus_text())
+    os.replace(tmp_path, path)
@@ -0,0 +1,3 @@
+# Tabs of the main page (pages/EverAge AI App.py). The page imports a tab's module only when that
+# tab is open, so the libraries behind it (the AI client, numpy/pandas/matplotlib, fpdf,
+# requests) load on first use instead of on every cold start.
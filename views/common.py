@@ -0,0 +1,39 @@
+import streamlit as st
+
+from utils.storage import get_store
+from utils.tracing import span
+
+# User-record access shared by the page and its tabs. Only the active user's record is read or
+# written (see utils/storage.py). Reads come from the process-wide record cache, so reruns don't
+# touch the disk; treat the result as read-only.
+
+
+def load_user_data(username):
+    with span("storage.load"):
+        return get_store().load_user(username)
+
+
+# Atomic read-modify-write of the stored record, so edits from other sessions are kept
+def update_user_data(username, mutate):
+    with span("storage.update"):
+        return get_store().update_user(username, mutate)
+
+
+# Small changes are appended as events (see utils/storage.py) instead of rewriting the record
+def append_user_events(username, *events):
+    with span("storage.append"):
+        return get_store().append_events(username, list(events))
+
+
+def get_checkin_matrix(username):
+    # Date x habit-ID matrix of this user's check-ins, kept in the session between reruns
+    # and reloaded (or rebuilt from the JSON check-ins) only when it is out of date
+    from utils.checkin_matrix import load_matrix
+
+    checkins = st.session_state.checkins
+    matrix = st.session_state.get("checkin_matrix")
+    if matrix is None or matrix.n_checkins != len(checkins):
+        with span("checkins.load"):
+            matrix = load_matrix(get_store(), username, checkins, st.session_state.habit_sets)
+        st.session_state.checkin_matrix = matrix
+    return matrix
@@ -0,0 +1,76 @@
+import uuid
+
+import streamlit as st
+
+from utils import outbox
+from utils.pdf import plan_pdf_bytes
+from utils.tracing import span
+
+# Tab 4: PDF download and email delivery of the latest plan
+
+
+# ========== EMAIL FUNCTION ==========
+# Emails go through the persistent outbox (utils/outbox.py); background workers deliver them
+# Clicks while a send is still pending share its nonce (no duplicate); once that send is sent or
+# failed the nonce is dropped, so the next click is a new email.
+def send_email_with_pdf(to_email, pdf_bytes):
+    outbox.configure(st.secrets["sendgrid"]["api_key"], st.secrets["sendgrid"]["from_email"])
+    outbox.ensure_workers()
+    nonce = st.session_state.setdefault("email_send_nonce", uuid.uuid4().hex)
+    with span("email.enqueue"):
+        return outbox.enqueue_email(
+            to_email,
+            "Your EverAge Longevity Plan 📄",
+            "Hi! Here’s your personalized EverAge longevity plan attached as a PDF. 🙊",
+            attachment=pdf_bytes,
+            filename="longevity_plan.pdf",
+            nonce=nonce
+        )
+
+
+def show_email_status(message_id):
+    status = outbox.email_status(message_id) or {"status": "failed", "attempts": 0, "last_error": "unknown message"}
+    if status["status"] == "sent":
+        st.success("✅ Email sent!")
+    elif status["status"] == "failed":
+        st.error(f"❌ Email failed. {status['last_error'] or ''}")
+    elif status["attempts"] > 1:
+        st.info(f"📨 Retrying delivery (attempt {status['attempts']})...")
+    else:
+        st.info("📨 Sending...")
+    return status["status"]
+
+
+# Polls only this fragment while delivery is pending, then hands back to a normal rerun
+@st.fragment(run_every=2)
+def poll_email_status(message_id):
+    if show_email_status(message_id) in ("sent", "failed"):
+        st.session_state.email_outbox_done = message_id
+        st.session_state.pop("email_send_nonce", None)
+        st.rerun()
+
+
+# ========== TAB ==========
+def render(username, user_data):
+    st.subheader("📄 Export Plan")
+    if st.session_state.history:
+        latest_plan = st.session_state.history[-1]
+        # The PDF is only laid out when a download or email is requested, and cached per plan version
+        st.download_button(
+            "📄 Download Plan as PDF",
+            data=lambda: plan_pdf_bytes(latest_plan),
+            file_name="longevity_plan.pdf",
+            mime="application/pdf",
+            on_click="ignore"
+        )
+
+        email_input = st.text_input("📬 Email to send to:", value=st.session_state.user_email)
+        if st.button("Send Plan via Email"):
+            st.session_state.email_outbox_id = send_email_with_pdf(email_input, plan_pdf_bytes(latest_plan))
+        message_id = st.session_state.get("email_outbox_id")
+        if message_id and st.session_state.get("email_outbox_done") == message_id:
+            show_email_status(message_id)
+        elif message_id:
+            poll_email_status(message_id)
+    else:
+        st.info("No plan available to export.")
@@ -0,0 +1,146 @@
+import os
+import time
+
+import streamlit as st
+
+from utils.ai import calculate_scores, extract_habits, get_ai_plan, stream_ai_plan
+from utils.ai_async import generate_plan, submit, wait_result
+from utils.ai_backends import get_backend
+from utils.habits import current_ids, ensure_habit_sets, register_habits
+from utils.plan_history import archive_overflow, push_plan
+from utils.plan_index import get_plan_index, profile_prompt
+from utils.storage import get_store
+from utils.streaks import new_streak_state, rebuild_streaks, streaks_match
+from utils.tracing import span
+from views.common import load_user_data, update_user_data
+
+# Tab 1: profile form, plan generation and regeneration
+
+# The stub and local backends (EVERAGE_AI_BACKEND) run without an OpenAI key
+if get_backend().name == "openai":
+    import openai
+
+    openai.api_key = st.secrets["openai"]["api_key"]
+# Stream the plan into the page as it is written (set EVERAGE_AI_STREAMING=0 for the single structured call)
+PLAN_STREAMING = os.environ.get("EVERAGE_AI_STREAMING", "1") != "0"
+
+
+# ========== AI FUNCTIONS ==========
+# Prompts, caching and the model backend live in utils/ai.py; bypass_cache forces a fresh answer
+def stream_plan(prompt, bypass_cache=False):
+    # Renders the plan as it is generated and returns (plan, habits, scores).
+    # Scores run in the background while the plan streams; habits are extracted once it closes.
+    if not PLAN_STREAMING:
+        plan, habits, scores = generate_plan(prompt, get_ai_plan, extract_habits, calculate_scores, bypass_cache=bypass_cache)
+        st.markdown(plan)
+        return plan, habits, scores
+    scores_future = submit(calculate_scores, prompt, bypass_cache=bypass_cache)
+    stream_stats = {}
+    plan = st.write_stream(stream_ai_plan(prompt, bypass_cache=bypass_cache, stats=stream_stats)).strip()
+    if "ttft" in stream_stats:
+        st.caption(f"⚡ First words after {stream_stats['ttft']:.1f}s")
+    with st.spinner("Picking your daily habits and scores..."):
+        habits = extract_habits(plan)
+        scores = wait_result(scores_future)
+    return plan, habits, scores
+
+
+def create_plan(profile, bypass_cache=False):
+    # A stored plan for a near-identical profile is served without calling the model
+    # (see utils/plan_index.py). Regenerate (bypass_cache) always asks for a fresh one and
+    # doesn't index it: it answers one user's rejection of a plan, not a common profile.
+    index = get_plan_index()
+    if bypass_cache:
+        with span("ai.plan"):
+            return stream_plan(profile_prompt(profile), bypass_cache=True)
+    with span("plan.lookup"):
+        match = index.lookup(profile)
+    if match:
+        st.markdown(match["plan"])
+        return match["plan"], match["habits"], match["scores"]
+    start = time.perf_counter()
+    with span("ai.plan"):
+        plan, habits, scores = stream_plan(profile_prompt(profile))
+    index.add(profile, plan, habits, scores, generation_seconds=time.perf_counter() - start)
+    return plan, habits, scores
+
+
+def set_plan_habits(data, habits):
+    # Registers the plan's habit set; habits carried over keep their streaks, new ones start at zero.
+    # If the stored streaks don't cover the previous set (e.g. a record from before streaks were
+    # stored), they are rebuilt from the check-ins instead, or kept habits would restart at zero.
+    ensure_habit_sets(data)
+    stale = not streaks_match(data.get("streaks") or {}, current_ids(data["habit_sets"]))
+    register_habits(data, habits)
+    if stale and data.get("checkins"):
+        streaks = rebuild_streaks(data["checkins"], data["habit_sets"])
+    else:
+        streaks = dict(data.get("streaks") or {})
+        for hid in current_ids(data["habit_sets"]):
+            streaks.setdefault(hid, new_streak_state())
+    data.update(habits=habits, streaks=streaks)
+
+
+# ========== TAB ==========
+def render(username, user_data):
+    st.subheader("Tell us about yourself 🧠")
+    age = st.number_input("Age", min_value=18, max_value=100, value=user_data.get("age", 30))
+    activity = st.selectbox("Activity Level", ["Low", "Moderate", "High"], index=["Low", "Moderate", "High"].index(user_data.get("activity", "Moderate")))
+    sleep = st.selectbox("Sleep Quality", ["Poor", "Average", "Good"], index=["Poor", "Average", "Good"].index(user_data.get("sleep", "Average")))
+    stress = st.selectbox("Stress Level", ["High", "Moderate", "Low"], index=["High", "Moderate", "Low"].index(user_data.get("stress", "Moderate")))
+    diet = st.selectbox("Diet Type", ["Standard", "Vegetarian", "Keto", "Mediterranean"], index=["Standard", "Vegetarian", "Keto", "Mediterranean"].index(user_data.get("diet", "Standard")))
+    goals = st.text_area("Health Goals", value=user_data.get("goals", ""))
+    email = st.text_input("Your Email", value=st.session_state.user_email)
+
+    if st.button("🧪 Generate My Longevity Plan"):
+        profile = {"age": age, "activity": activity, "sleep": sleep, "stress": stress, "diet": diet, "goals": goals}
+        try:
+            plan, habits, scores = create_plan(profile)
+        except TimeoutError:
+            st.error("⏱️ The AI took too long to respond. Please try again.")
+            st.stop()
+
+        archived = archive_overflow(get_store(), load_user_data(username))
+
+        def add_plan(data):
+            push_plan(data, plan, archived)
+            set_plan_habits(data, habits)
+            data.update(scores=scores, user_email=email)
+
+        saved = update_user_data(username, add_plan)
+        st.session_state.history = saved["history"]
+        st.session_state.history_archive = saved["history_archive"]
+        st.session_state.checkins = saved.get("checkins", [])
+        st.session_state.streaks = saved["streaks"]
+        st.session_state.habits = habits
+        st.session_state.habit_sets = saved["habit_sets"]
+        st.session_state.scores = scores
+        st.session_state.user_email = email
+        st.success("✅ Plan created!")
+
+    if st.button("♻️ Regenerate My Plan") and st.session_state.history:
+        profile = {"age": age, "activity": activity, "sleep": sleep, "stress": stress, "diet": diet, "goals": goals}
+        try:
+            plan, habits, scores = create_plan(profile, bypass_cache=True)
+        except TimeoutError:
+            st.error("⏱️ The AI took too long to respond. Please try again.")
+            st.stop()
+
+        # The rejected plan isn't served to the next similar profile
+        get_plan_index().remove(st.session_state.history[-1])
+
+        def replace_plan(data):
+            history = data.setdefault("history", [])
+            if history:
+                history[-1] = plan
+            else:
+                history.append(plan)
+            set_plan_habits(data, habits)
+            data.update(scores=scores)
+
+        saved = update_user_data(username, replace_plan)
+        st.session_state.history = saved["history"]
+        st.session_state.streaks = saved["streaks"]
+        st.session_state.habits = habits
+        st.session_state.habit_sets = saved["habit_sets"]
+        st.session_state.scores = scores
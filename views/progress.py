@@ -0,0 +1,58 @@
+import streamlit as st
+
+from utils.charts import show_progress_chart
+from utils.checkin_matrix import streaks_from_matrix
+from utils.habits import current_ids
+from utils.streaks import streaks_match
+from utils.tracing import span
+from views.common import append_user_events, get_checkin_matrix
+
+# Tab 3: completion charts, adherence, scores and streaks
+
+
+def render(username, user_data):
+    st.subheader("📈 Weekly Progress")
+
+    if not st.session_state.checkins:
+        st.info("No check-ins yet.")
+    else:
+        # Analytics for the current plan's habits, including their history from earlier plans
+        habit_ids = current_ids(st.session_state.habit_sets)
+        matrix = get_checkin_matrix(username).select(habit_ids) if habit_ids else get_checkin_matrix(username)
+        native_chart = st.toggle("⚡ Lightweight chart", value=False)
+        show_progress_chart(matrix, native=native_chart)
+
+        weekly = matrix.weekly_completion_rates()
+        monthly = matrix.monthly_completion_rates()
+        col_w, col_m = st.columns(2)
+        col_w.metric("Latest Week", f"{weekly.iloc[-1]:.0%}", delta=f"{weekly.iloc[-1] - weekly.iloc[-2]:+.0%}" if len(weekly) > 1 else None)
+        col_m.metric("Latest Month", f"{monthly.iloc[-1]:.0%}", delta=f"{monthly.iloc[-1] - monthly.iloc[-2]:+.0%}" if len(monthly) > 1 else None)
+        st.markdown("**📅 7-Day Average (habits per day):**")
+        st.line_chart(matrix.rolling_completed(7))
+
+        if st.session_state.habits:
+            st.markdown("**🎯 Habit Adherence:**")
+            for h, rate in zip(st.session_state.habits, matrix.habit_adherence()):
+                st.progress(float(rate), text=f"{h}: {rate:.0%}")
+
+    if st.session_state.scores:
+        st.markdown("**🧠 Health Scores:**")
+        for k, v in st.session_state.scores.items():
+            st.progress(v / 100, text=f"{k}: {v}")
+
+    if st.session_state.habits:
+        streaks = st.session_state.streaks
+        habit_ids = current_ids(st.session_state.habit_sets)
+        if not streaks_match(streaks, habit_ids):
+            # Repair path: records saved before streaks were stored, or habits changed elsewhere
+            with span("streaks"):
+                matrix = get_checkin_matrix(username)
+                streaks = streaks_from_matrix(matrix, list(dict.fromkeys(matrix.habit_ids + habit_ids)))
+            append_user_events(username, {"op": "set", "fields": {"streaks": streaks}})
+            st.session_state.streaks = streaks
+        st.subheader("🔥 Habit Streaks")
+        for h, hid in zip(st.session_state.habits, habit_ids):
+            s = streaks[hid]
+            if s['current'] == 3:
+                st.success(f"🔥 You're on a 3-day streak for **{h}**! Keep it up!")
+            st.markdown(f"**{h}** — Current: {s['current']} 🔁 | Best: {s['best']} 🏆")
@@ -0,0 +1,30 @@
+from datetime import datetime
+
+import streamlit as st
+
+from utils.storage import get_store
+from views.common import append_user_events
+
+# Tab 2: daily check-in against the current plan's habits
+
+
+def render(username, user_data):
+    st.subheader("🗓️ Daily Check-in")
+    if st.session_state.habits:
+        today = datetime.now().strftime("%Y-%m-%d")
+        checks = [st.checkbox(h, key=f"chk_{i}") for i, h in enumerate(st.session_state.habits)]
+        if st.button("Submit Today’s Check-in"):
+            # "v" ties the positional flags to this habit set, whatever plans come later
+            entry = {"date": today, "checked": checks, "v": len(st.session_state.habit_sets) - 1}
+
+            saved = append_user_events(username, {"op": "checkin", "entry": entry})
+            matrix = st.session_state.get("checkin_matrix")
+            if matrix is not None and matrix.n_checkins == len(saved["checkins"]) - 1:
+                from utils.checkin_matrix import save_matrix
+
+                save_matrix(get_store(), username, matrix.append(entry, saved["habit_sets"]))
+            st.session_state.checkins = saved["checkins"]
+            st.session_state.streaks = saved["streaks"]
+            st.success("📌 Check-in saved!")
+    else:
+        st.info("Please generate a plan first.")
@@ -0,0 +1,149 @@
+import argparse
+import itertools
+import sys
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import openai
+
+from utils.ai_async import generate_plan
+from utils.ai_backends import backend_stats, get_backend
+from utils.plan_index import AGE_BAND_YEARS, get_plan_index, profile_bucket, profile_prompt
+from utils.settings import load_secrets
+from utils.storage import get_store
+
+# Offline warm-up: pre-generates plans for the most common onboarding profiles so first-time
+# users get an instant plan and a fresh deploy doesn't send every new user to the API at once.
+#
+#   python warm_plan_cache.py                       # top 40 profiles x 3 goals, 8 parallel requests
+#   python warm_plan_cache.py --top 100 --workers 16
+#   python warm_plan_cache.py --dry-run             # just list the profiles that would be warmed
+#
+# Profiles are ranked by how often their age band / activity / sleep / stress / diet combination
+# occurs in the user store; combinations nobody has picked yet follow, ordered by the product of
+# the individual answers' frequencies. Generated plans are stored in the plan index, which the
+# page checks before calling the model.
+#
+# Goals are free text and warmed plans are served to other users, so a user's own goal text is
+# only used once at least --min-goal-users people wrote it; otherwise DEFAULT_GOALS fill in.
+
+# Onboarding answers, most likely first: this order breaks ties when the store has little data
+ACTIVITY = ["Moderate", "Low", "High"]
+SLEEP = ["Average", "Poor", "Good"]
+STRESS = ["Moderate", "High", "Low"]
+DIET = ["Standard", "Mediterranean", "Vegetarian", "Keto"]
+AGE_BANDS = [30, 40, 50, 20, 60, 70, 10, 80, 90]
+MIN_AGE, MAX_AGE = 18, 100
+# Used when the store has too few goals to pick from
+DEFAULT_GOALS = ["more energy", "lose weight", "sleep better", "reduce stress", "live longer"]
+# Users who must have written a goal text before it is warmed (and shared)
+MIN_GOAL_USERS = 5
+
+
+def observed_profiles():
+    # (bucket counts, ages per bucket, goals per bucket, global goals) from the user store
+    buckets, ages, goals, all_goals = Counter(), defaultdict(Counter), defaultdict(Counter), Counter()
+    for _, record in get_store().iter_users():
+        if not all(record.get(k) not in (None, "") for k in ("age", "activity", "sleep", "stress", "diet")):
+            continue
+        bucket = profile_bucket(record)
+        buckets[bucket] += 1
+        ages[bucket][int(record["age"])] += 1
+        text = (record.get("goals") or "").strip()
+        if text:
+            goals[bucket][text] += 1
+            all_goals[text] += 1
+    return buckets, ages, goals, all_goals
+
+
+def common_profiles(top, goals_per_profile, min_goal_users=MIN_GOAL_USERS):
+    buckets, ages, goals, all_goals = observed_profiles()
+    marginals = [Counter() for _ in range(5)]
+    for bucket, count in buckets.items():
+        for i, value in enumerate(bucket.split("|")):
+            marginals[i][value] += count
+
+    def rank(bucket):
+        # Observed combinations first, then by product of (smoothed) marginal frequencies
+        prior = 1.0
+        for i, value in enumerate(bucket.split("|")):
+            prior *= marginals[i][value] + 1
+        return (buckets[bucket], prior)
+
+    candidates = [
+        f"{band}|{activity}|{sleep}|{stress}|{diet}"
+        for band, activity, sleep, stress, diet in itertools.product(AGE_BANDS, ACTIVITY, SLEEP, STRESS, DIET)
+    ]
+    fallback_goals = [g for g, n in all_goals.most_common() if n >= min_goal_users] + DEFAULT_GOALS
+    profiles = []
+    for bucket in sorted(candidates, key=rank, reverse=True)[:top]:
+        band, activity, sleep, stress, diet = bucket.split("|")
+        if ages[bucket]:
+            age = ages[bucket].most_common(1)[0][0]
+        else:
+            age = min(MAX_AGE, max(MIN_AGE, int(band) + AGE_BAND_YEARS // 2))
+        picked = [g for g, n in goals[bucket].most_common() if n >= min_goal_users][:goals_per_profile]
+        for g in fallback_goals:
+            if len(picked) >= goals_per_profile:
+                break
+            if g not in picked:
+                picked.append(g)
+        for g in picked:
+            profiles.append({"age": age, "activity": activity, "sleep": sleep, "stress": stress, "diet": diet, "goals": g})
+    return profiles
+
+
+def warm(profile):
+    # Returns "indexed" or "skipped" (already covered by the plan index)
+    index = get_plan_index()
+    if index.lookup(profile):
+        return "skipped"
+    start = time.perf_counter()
+    plan, habits, scores = generate_plan(profile_prompt(profile))
+    index.add(profile, plan, habits, scores, generation_seconds=time.perf_counter() - start)
+    return "indexed"
+
+
+def run(profiles, workers):
+    counts = Counter()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="everage-warm") as pool:
+        futures = {pool.submit(warm, profile): profile for profile in profiles}
+        for future in as_completed(futures):
+            try:
+                counts[future.result()] += 1
+            except Exception as e:
+                counts["errors"] += 1
+                print(f"❌ {profile_prompt(futures[future])}: {e}", file=sys.stderr)
+    return counts, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-generate plans for the most common onboarding profiles")
+    parser.add_argument("--top", type=int, default=40, help="profile combinations to warm")
+    parser.add_argument("--goals", type=int, default=3, help="goal texts per combination")
+    parser.add_argument("--workers", type=int, default=8, help="parallel plan requests")
+    parser.add_argument("--min-goal-users", type=int, default=MIN_GOAL_USERS,
+                        help="users who must have written a goal text before it is used")
+    parser.add_argument("--dry-run", action="store_true", help="list the profiles without generating")
+    args = parser.parse_args()
+
+    profiles = common_profiles(args.top, args.goals, args.min_goal_users)
+    if args.dry_run:
+        for profile in profiles:
+            print(profile_prompt(profile))
+        return
+
+    if get_backend().name == "openai":
+        openai.api_key = load_secrets().get("openai", {}).get("api_key")
+    print(f"🔥 Warming {len(profiles)} profiles with {args.workers} parallel requests...")
+    counts, elapsed = run(profiles, args.workers)
+    print(f"✅ {counts['indexed']} plans generated, {counts['skipped']} already covered, {counts['errors']} errors "
+          f"in {elapsed:.1f}s")
+    for name, stats in backend_stats().items():
+        print(f"   {name}: {stats['calls']} calls, ${stats['cost_usd']:.4f}")
+
+
+if __name__ == "__main__":
+    main()
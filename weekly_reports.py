@@ -0,0 +1,166 @@
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import date, timedelta
+
+from utils import outbox
+from utils.settings import load_secrets
+from utils.storage import get_store
+
+# Batch job: weekly progress report PDF + email for every user in the data store.
+#
+#   python weekly_reports.py                  # last full week (Mon-Sun), 4 worker processes
+#   python weekly_reports.py --week-ending 2025-05-25 --workers 8
+#   python weekly_reports.py --dry-run        # render only, queue nothing
+#
+# Progress is checkpointed per user in data/reports/<week>.done, so a crashed run picks up
+# where it stopped (a --dry-run keeps its own data/reports/<week>.dry-run.done, so it never marks
+# users as done for the real run). Emails use the outbox idempotency key "weekly-report:<week>:<user>",
+# so a user is never emailed twice for the same week.
+
+REPORT_DIR = os.path.join("data", "reports")
+
+
+def last_full_week_end(today=None):
+    today = today or date.today()
+    return today - timedelta(days=today.weekday() + 1)
+
+
+# ========== WORKER (runs in a child process) ==========
+def build_report(username, record, week_end_iso):
+    from utils.checkin_matrix import CheckinMatrix, streaks_from_matrix
+    from utils.habits import current_ids, ensure_habit_sets
+    from utils.pdf import render_text_pdf
+    import numpy as np
+
+    ensure_habit_sets(record)
+    habits = record.get("habits") or []
+    habit_ids = current_ids(record["habit_sets"])
+    checkins = record.get("checkins") or []
+    week_end = np.datetime64(week_end_iso, "D")
+    week_start = week_end - 6
+    # Current plan's habits, with their check-ins from earlier plans too
+    matrix = CheckinMatrix.from_checkins(checkins, record["habit_sets"]).select(habit_ids)
+    in_week = (matrix.dates >= week_start) & (matrix.dates <= week_end)
+    days_done = matrix.done[in_week].sum(axis=0)
+    streaks = streaks_from_matrix(matrix, habit_ids)
+    total = int(days_done.sum())
+    possible = 7 * len(habits)
+
+    lines = [
+        f"EverAge Weekly Report: {week_start} to {week_end}",
+        "",
+        f"Hi {record.get('name') or username},",
+        "",
+        f"This week you completed {total} of {possible} habit check-ins ({total / possible:.0%}).",
+        "",
+        "Habit adherence:",
+    ]
+    for habit, hid, done in zip(habits, habit_ids, days_done):
+        s = streaks[hid]
+        lines.append(f"- {habit}: {int(done)}/7 days (current streak {s['current']}, best {s['best']})")
+    lines += ["", "Keep going - small steps every day add up to a longer, healthier life."]
+    # The core PDF fonts are latin-1 only
+    text = "\n".join(lines).encode("latin-1", "replace").decode("latin-1")
+    return {"username": username, "email": record.get("user_email"), "pdf": render_text_pdf(text), "rate": total / possible}
+
+
+# ========== DRIVER ==========
+def eligible(record):
+    return bool(record.get("user_email") and record.get("habits") and record.get("checkins"))
+
+
+def load_checkpoint(path):
+    if not os.path.exists(path):
+        return set()
+    with open(path) as f:
+        return {line.rstrip("\n") for line in f if line.strip()}
+
+
+def run(week_end, workers, max_in_flight, dry_run):
+    os.makedirs(REPORT_DIR, exist_ok=True)
+    week = week_end.isoformat()
+    checkpoint_path = os.path.join(REPORT_DIR, f"{week}.dry-run.done" if dry_run else f"{week}.done")
+    done = load_checkpoint(checkpoint_path)
+    counts = {"reported": 0, "skipped": 0, "resumed": len(done), "errors": 0}
+
+    start = time.perf_counter()
+    with open(checkpoint_path, "a") as checkpoint, ProcessPoolExecutor(max_workers=workers) as pool:
+        def finish(username):
+            checkpoint.write(username + "\n")
+            checkpoint.flush()
+
+        def collect(futures):
+            for future in futures:
+                username = in_flight.pop(future)
+                try:
+                    report = future.result()
+                except Exception as e:
+                    counts["errors"] += 1
+                    print(f"❌ {username}: {e}", file=sys.stderr)
+                    continue
+                if not dry_run:
+                    outbox.enqueue_email(
+                        report["email"],
+                        f"Your EverAge weekly report ({week})",
+                        f"Hi! Here's your EverAge progress for the week ending {week}: "
+                        f"{report['rate']:.0%} of your habits completed. Full report attached.",
+                        attachment=report["pdf"],
+                        filename=f"everage_weekly_{week}.pdf",
+                        key=f"weekly-report:{week}:{username}",
+                    )
+                counts["reported"] += 1
+                finish(username)
+
+        # Users are streamed from the store and at most max_in_flight records are held at once
+        in_flight = {}
+        for username, record in get_store().iter_users():
+            if username in done:
+                continue
+            if not eligible(record):
+                counts["skipped"] += 1
+                finish(username)
+                continue
+            subset = {k: record[k] for k in ("name", "user_email", "habits", "habit_sets", "checkins") if k in record}
+            in_flight[pool.submit(build_report, username, subset, week)] = username
+            if len(in_flight) >= max_in_flight:
+                finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                collect(finished)
+        collect(list(wait(in_flight)[0]))
+    elapsed = time.perf_counter() - start
+    return counts, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render and email weekly progress reports for all users")
+    parser.add_argument("--week-ending", type=date.fromisoformat, default=None, help="last day of the week (default: last Sunday)")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--max-in-flight", type=int, default=None, help="records held in memory at once (default: 4 x workers)")
+    parser.add_argument("--dry-run", action="store_true", help="render reports but don't queue emails")
+    parser.add_argument("--no-deliver", action="store_true", help="queue emails but leave delivery to the app's workers")
+    args = parser.parse_args()
+
+    week_end = args.week_ending or last_full_week_end()
+    if not args.dry_run:
+        sendgrid = load_secrets().get("sendgrid", {})
+        outbox.configure(sendgrid.get("api_key"), sendgrid.get("from_email"))
+
+    print(f"📊 Weekly reports for the week ending {week_end}...")
+    counts, elapsed = run(week_end, args.workers, args.max_in_flight or 4 * args.workers, args.dry_run)
+    processed = counts["reported"] + counts["skipped"]
+    print(f"✅ {counts['reported']} reports, {counts['skipped']} skipped, {counts['errors']} errors, "
+          f"{counts['resumed']} already done from a previous run")
+    print(f"⏱️ {processed} users in {elapsed:.1f}s ({processed / elapsed if elapsed else 0:.1f} users/sec)")
+
+    if not args.dry_run and not args.no_deliver:
+        print("📮 Delivering queued emails...")
+        outbox.ensure_workers(4)
+        while outbox.queue_depth():
+            time.sleep(1)
+        print("✅ Outbox drained")
+
+
+if __name__ == "__main__":
+    main()